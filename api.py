@@ -0,0 +1,159 @@
+"""
+Read-only HTTP API over immutable snapshots of the bot's state.
+
+The bot publishes a new snapshot from save_data()/save_elo(); Flask serves it from its
+own thread, so dashboards never touch the live dicts or the bot's event loop.
+
+    GET /api/queues
+    GET /api/games?status=active&page=1&per_page=50
+    GET /api/games/<match_id>
+    GET /api/teams/<channel_id>
+    GET /api/leaderboard?page=1&per_page=50
+
+Every response carries an ETag; send it back as If-None-Match to get a 304 when nothing changed.
+"""
+import threading
+import uuid
+from types import MappingProxyType
+
+from flask import Flask, abort, jsonify, request
+
+MAX_PER_PAGE = 500
+
+
+class Snapshot:
+    """One published state. Sections are never mutated after publishing; unchanged ones are shared."""
+    __slots__ = ("sections", "versions", "cache")
+
+    def __init__(self, sections, versions):
+        self.sections = MappingProxyType(sections)
+        self.versions = MappingProxyType(versions)
+        self.cache = {}  # derived views (sorted leaderboard, filtered games), built on first request
+
+    def derived(self, key, build):
+        value = self.cache.get(key)
+        if value is None:
+            value = self.cache[key] = build()
+        return value
+
+
+class SnapshotStore:
+    def __init__(self):
+        self._version = 0
+        self.epoch = uuid.uuid4().hex[:8]  # versions restart every process; tags from a previous one must not match
+        self._current = Snapshot({"queues": {}, "games": {}, "drafts": {}, "elo": {}}, {})
+
+    def publish(self, **sections):
+        """Swap in a new snapshot, reusing every section that isn't passed in or didn't change (loop thread only)."""
+        old = self._current
+        # Unchanged sections keep their version, so clients polling them keep getting 304s
+        sections = {name: value for name, value in sections.items() if value != old.sections.get(name)}
+        if not sections:
+            return
+        self._version += 1
+        merged = dict(old.sections)
+        merged.update(sections)
+        versions = dict(old.versions)
+        versions.update((name, self._version) for name in sections)
+        self._current = Snapshot(merged, versions)  # single reference swap, safe for reader threads
+
+    def current(self):
+        return self._current
+
+
+snapshots = SnapshotStore()
+app = Flask(__name__)
+
+
+def cached_response(snapshot, section, build):
+    """Serve `build()` with an ETag tied to this process and the section version, or 304 if the client already has it."""
+    tag = f"{snapshots.epoch}-{section}-{snapshot.versions.get(section, 0)}-{request.query_string.decode()}"
+    if request.if_none_match.contains_weak(tag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def paginate(items):
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(MAX_PER_PAGE, max(1, request.args.get("per_page", 50, type=int)))
+    start = (page - 1) * per_page
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": len(items),
+        "items": items[start:start + per_page]
+    }
+
+
+@app.get("/api/queues")
+def get_queues():
+    snap = snapshots.current()
+    return cached_response(snap, "queues", lambda: dict(snap.sections["queues"]))
+
+
+@app.get("/api/games")
+def get_games():
+    snap = snapshots.current()
+    status = request.args.get("status")
+
+    def build():
+        games = snap.sections["games"]
+        rows = snap.derived(("games", status), lambda: [
+            {"id": match_id, **game}
+            for match_id, game in reversed(games.items())  # newest first
+            if status is None or game["status"] == status
+        ])
+        return paginate(rows)
+    return cached_response(snap, "games", build)
+
+
+@app.get("/api/games/<match_id>")
+def get_game(match_id):
+    snap = snapshots.current()
+    game = snap.sections["games"].get(match_id)
+    if game is None:
+        abort(404)
+    return cached_response(snap, "games", lambda: {"id": match_id, **game})
+
+
+@app.get("/api/teams/<int:channel_id>")
+def get_teams(channel_id):
+    snap = snapshots.current()
+    draft = snap.sections["drafts"].get(str(channel_id))
+    if draft is None:
+        abort(404)
+    return cached_response(snap, "drafts", lambda: {
+        "match_id": draft.get("id"),
+        "captains": draft.get("captains", []),
+        "teams": draft.get("teams", {}),
+        "remaining": draft.get("remaining", [])
+    })
+
+
+@app.get("/api/leaderboard")
+def get_leaderboard():
+    snap = snapshots.current()
+
+    def build():
+        ranked = snap.derived("leaderboard", lambda: [
+            {"rank": i, "user_id": user_id, "elo": elo}
+            for i, (user_id, elo) in enumerate(
+                sorted(snap.sections["elo"].items(), key=lambda x: x[1], reverse=True), start=1)
+        ])
+        return paginate(ranked)
+    return cached_response(snap, "elo", build)
+
+
+def start_api(host="0.0.0.0", port=8080):
+    """Serve the API from a daemon thread next to the bot."""
+    thread = threading.Thread(
+        target=lambda: app.run(host=host, port=port, threaded=True, use_reloader=False),
+        name="query-api",
+        daemon=True
+    )
+    thread.start()
+    return thread
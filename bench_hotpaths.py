@@ -0,0 +1,194 @@
+"""
+Micro-benchmarks for the hot pure-Python paths in main.py, with regression thresholds.
+
+    python bench_hotpaths.py --save                 # record bench_baseline.json on this machine
+    python bench_hotpaths.py                        # compare; exit 1 if anything regressed past its threshold
+    python bench_hotpaths.py --threshold 0.1 --sizes 1000,100000
+
+Each timing is the median of several samples, in seconds per call; a sample loops the call until it
+takes at least --min-time, so microsecond paths aren't at the mercy of timer resolution. A benchmark
+only fails when it's slower than its threshold (--threshold, or a wider one for fsync-bound paths)
+AND than the noise seen between samples, so one jittery run doesn't fail the check.
+Baselines are machine-specific: record them on the box (or CI runner) you compare on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "bench_baseline.json")
+
+# Disk-bound benchmarks swing with the page cache and fsync latency far more than CPU-bound ones
+THRESHOLDS = {"save_elo": 1.0, "save_data": 0.5, "load_data": 0.5}
+NOISE_FACTOR = 3  # a slowdown must also exceed this many times the observed sample spread
+
+MIN_TIME = 0.2  # seconds per sample; set from --min-time
+
+
+def measure(fn, samples=7, budget=3.0, min_samples=3):
+    """Median seconds per call of `fn()`, and the samples' relative spread (IQR / median).
+
+    Each sample runs `fn` enough times to take at least MIN_TIME (timeit's autorange); sampling stops
+    once `budget` seconds are spent, after `min_samples`.
+    """
+    timer = timeit.Timer(fn)
+    loops, elapsed = 1, 0.0
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= MIN_TIME:
+            break
+        loops *= 2 if elapsed * 10 >= MIN_TIME else 10
+
+    times = [elapsed / loops]
+    spent = elapsed
+    while len(times) < samples and (spent < budget or len(times) < min_samples):
+        elapsed = timer.timeit(loops)
+        times.append(elapsed / loops)
+        spent += elapsed
+
+    median = statistics.median(times)
+    low, _, high = statistics.quantiles(times, n=4) if len(times) >= 2 else (median, median, median)
+    return {"median": median, "spread": (high - low) / median}
+
+
+def fake_id(rng):
+    return rng.randrange(10**17, 10**19)
+
+
+def fill_state(main, rng, games=0, players=0, channels=0):
+    """Populate main's state with synthetic but realistically shaped data."""
+    main.registered_channels.clear()
+    main.queues.clear()
+    main.games.clear()
+    main.drafts.clear()
+    main.elo_data.clear()
+
+    for _ in range(channels):
+        channel_id = fake_id(rng)
+        main.registered_channels[channel_id] = {"size": 10, "active_game": None}
+        main.queues[channel_id] = [fake_id(rng) for _ in range(rng.randrange(10))]
+
+    for i in range(games):
+        game = main.GameRecord(fake_id(rng), [fake_id(rng) for _ in range(10)], status="finished",
+                               map=rng.choice(["Bastion", "Castle", "Helix"]),
+                               gamemode=rng.choice(["KOTC", "Classic"]), region="US East")
+        game.winner = game.players[0]
+        main.games[f"{i:08x}"] = game
+
+    for _ in range(players):
+        main.elo_data[str(fake_id(rng))] = rng.randrange(0, 3000)
+
+
+def run_benchmarks(main, sizes):
+    rng = random.Random(1234)
+    results = {}
+
+    for n in sizes:
+        fill_state(main, rng, games=n, channels=10)
+        results[f"save_data[{n}]"] = measure(main.save_data)
+        results[f"load_data[{n}]"] = measure(main.load_data)
+
+        fill_state(main, rng, players=n)
+        results[f"save_elo[{n}]"] = measure(main.save_elo)
+        results[f"leaderboard_sort[{n}]"] = measure(main.sorted_leaderboard)
+
+    for channels in (10, 100, 1000):
+        fill_state(main, rng, channels=channels)
+        missing = fake_id(rng)  # worst case: not queued anywhere, every channel is scanned
+        results[f"find_user_in_queues[{channels}ch]"] = measure(lambda: main.find_user_in_queues(missing))
+
+    players = [fake_id(rng) for _ in range(10)]
+    main.drafts[1] = {"id": "bench", "captains": players[:2],
+                      "teams": {players[0]: players[2:6], players[1]: players[6:]}}
+    results["get_all_players[10]"] = measure(lambda: main.get_all_players(1))
+
+    fill_state(main, rng, players=max(sizes))
+    entries = main.sorted_leaderboard()
+
+    async def format_pages():
+        view = main.LeaderboardView(entries)  # discord.py views need a running loop
+        view.page = len(entries) // view.per_page // 2
+        return measure(view.format_page)
+    results["LeaderboardView.format_page"] = asyncio.run(format_pages())
+
+    return results
+
+
+def allowed_slowdown(name, now, base, threshold):
+    """Slowdown `name` may show before it counts as a regression: its threshold, widened to the noise."""
+    threshold = max(threshold, THRESHOLDS.get(name.split("[")[0], 0))
+    return max(threshold, NOISE_FACTOR * max(now["spread"], base["spread"]))
+
+
+def compare(results, baseline, threshold):
+    """Print a results table and return the names that regressed past their allowed slowdown."""
+    regressions = []
+    print(f"{'benchmark':<36}{'now':>12}{'baseline':>12}{'change':>9}{'allowed':>9}")
+    for name, now in results.items():
+        base = baseline.get(name)
+        if isinstance(base, (int, float)):  # baselines saved before medians were recorded
+            base = {"median": base, "spread": 0}
+        if base:
+            change = now["median"] / base["median"] - 1
+            allowed = allowed_slowdown(name, now, base, threshold)
+            flag = " ❌" if change > allowed else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<36}{now['median'] * 1000:>10.4f}ms{base['median'] * 1000:>10.4f}ms"
+                  f"{change:>+9.0%}{allowed:>+9.0%}{flag}")
+        else:
+            print(f"{name:<36}{now['median'] * 1000:>10.4f}ms{'—':>12}{'':>9}{'':>9}")
+    return regressions
+
+
+def main_cli():
+    global MIN_TIME
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="record counts for persistence/sort benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (0.25 = 25%%); disk-bound benchmarks allow more")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="minimum seconds per timing sample")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    MIN_TIME = args.min_time
+
+    # main.py reads and writes its JSON files in the working directory — keep that in a scratch dir
+    workdir = tempfile.mkdtemp(prefix="scrim-bench-")
+    os.environ["RECORD_EVENTS"] = ""
+    sys.path.insert(0, HERE)
+    os.chdir(workdir)
+    try:
+        import main
+        results = run_benchmarks(main, sizes)
+    finally:
+        os.chdir(HERE)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"❌ {len(regressions)} benchmark(s) regressed past their allowed slowdown: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,53 @@
+"""
+Memory benchmark for match history: bytes per game for plain dicts vs GameRecord.
+
+    python bench_records.py                 # 100k and 1M games
+    python bench_records.py 10000 50000     # custom sizes
+"""
+import random
+import sys
+import tracemalloc
+import uuid
+
+from records import GameRecord
+
+MAPS = ["Cluckgrounds", "Bastion", "2 Towers", "Helix", "Castle", "Growler", "Road"]
+REGIONS = ["US West", "US East", "US Central"]
+
+
+def sample_game(rng):
+    """One finished 10-player match, shaped like what start_draft/start_game/winner leave behind."""
+    players = [rng.randrange(10**17, 10**19) for _ in range(10)]
+    # Fresh str objects per game, the way json.load hands them back
+    return {
+        "channel": rng.randrange(10**17, 10**19),
+        "players": players,
+        "status": "".join("finished"),
+        "map": "".join(rng.choice(MAPS)),
+        "winner": players[0],
+        "gamemode": "".join(rng.choice(["KOTC", "Classic"])),
+        "region": "".join(rng.choice(REGIONS)),
+    }
+
+
+def measure(count, build):
+    rng = random.Random(42)
+    tracemalloc.start()
+    games = {str(uuid.UUID(int=rng.getrandbits(128)))[:8]: build(sample_game(rng)) for _ in range(count)}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return size / count
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'games':>10}{'dict B/game':>14}{'GameRecord B/game':>20}{'saved':>8}")
+    for count in sizes:
+        as_dict = measure(count, lambda g: g)
+        as_record = measure(count, GameRecord.from_json)
+        print(f"{count:>10}{as_dict:>14.0f}{as_record:>20.0f}{1 - as_record / as_dict:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
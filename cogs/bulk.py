@@ -0,0 +1,240 @@
+"""Streaming export/import of ratings, bans and match history (loaded on first use)."""
+import asyncio
+import csv
+import gzip
+import heapq
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import discord
+from discord.ext import commands
+
+from main import (
+    GameRecord, active_bans, ban_heap, drafts, elo_committer, elo_data, games, queue_bans, registered_channels,
+    save_bans, save_data, schedule_ban_purge
+)
+
+BULK_KINDS = ("ratings", "bans", "matches")
+BULK_FIELDS = {
+    "ratings": ["user_id", "elo"],
+    "bans": ["user_id", "expiry"],
+    "matches": ["id", "channel", "status", "map", "gamemode", "region", "winner", "players"]
+}
+BULK_BATCH = 1000  # rows handled between yields to the event loop
+IMPORT_MAX_ERRORS = 10
+
+def export_rows(kind):
+    """Lazily yield one dict per rating, active ban, or match."""
+    if kind == "ratings":
+        for user_id in list(elo_data):  # key snapshot; values are read as we go
+            if user_id in elo_data:
+                yield {"user_id": user_id, "elo": elo_data[user_id]}
+    elif kind == "bans":
+        for user_id, expiry in active_bans():
+            yield {"user_id": user_id, "expiry": expiry}
+    else:
+        for match_id in list(games):
+            game = games.get(match_id)
+            if game:
+                yield {"id": match_id, **game.to_json()}
+
+async def write_export(kind, fmt, f):
+    """Stream `kind` into text file `f` as CSV or JSONL; returns the row count."""
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(f, fieldnames=BULK_FIELDS[kind], extrasaction="ignore")
+        writer.writeheader()
+    count = 0
+    for row in export_rows(kind):
+        if writer:
+            if kind == "matches":
+                row["players"] = " ".join(map(str, row["players"]))  # teams and traces are JSONL-only
+            writer.writerow(row)
+        else:
+            f.write(json.dumps(row) + "\n")
+        count += 1
+        if count % BULK_BATCH == 0:
+            await asyncio.sleep(0)
+    return count
+
+def read_import(path):
+    """Lazily yield (line number, raw row) from a CSV or JSONL file, optionally gzipped."""
+    name = path[:-3] if path.endswith(".gz") else path
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        if name.endswith(".csv"):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, line
+
+def discord_id(value, field):
+    """A Discord ID as an int in [0, 2**64); numeric strings are fine, floats and bools are not."""
+    if isinstance(value, (bool, float)):
+        raise ValueError(f"{field} must be an integer ID")
+    value = int(value)
+    if not 0 <= value < 2 ** 64:
+        raise ValueError(f"{field} {value} is out of range")
+    return value
+
+def parse_import_row(kind, raw):
+    """Validate one imported row; returns (key, value) to stage or raises ValueError/KeyError/TypeError."""
+    row = json.loads(raw) if isinstance(raw, str) else raw
+    if kind == "ratings":
+        elo = int(row["elo"])
+        if elo < 0:
+            raise ValueError("elo must be >= 0")
+        return str(discord_id(row["user_id"], "user_id")), elo
+    if kind == "bans":
+        return discord_id(row["user_id"], "user_id"), float(row["expiry"])
+
+    match_id = str(row["id"]).strip()
+    if not match_id:
+        raise ValueError("empty match id")
+    if isinstance(raw, str):
+        row = dict(row)
+        if not isinstance(row.get("players", []), list):
+            raise TypeError("players must be a list")
+        players = row.get("players", [])
+        if row.get("teams"):
+            row["teams"] = {
+                str(discord_id(c, "captain")): [discord_id(m, "team member") for m in members]
+                for c, members in row["teams"].items()
+            }
+    else:  # CSV: every field is a string, blanks mean unset
+        row = {k: v or None for k, v in row.items()}
+        players = (row["players"] or "").split()
+        row["status"] = row["status"] or "finished"
+    row["channel"] = discord_id(row["channel"], "channel")
+    row["players"] = [discord_id(p, "player") for p in players]
+    row["winner"] = discord_id(row["winner"], "winner") if row.get("winner") is not None else None
+    return match_id, GameRecord.from_json(row)
+
+async def stage_import(kind, path):
+    """Validate every row in batches without touching live state; returns (staged dict, rows, errors)."""
+    staged = {}
+    errors = []
+    rows = 0
+    for line_no, raw in read_import(path):
+        rows += 1
+        try:
+            key, value = parse_import_row(kind, raw)
+            staged[key] = value
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError) as e:
+            errors.append(f"line {line_no}: {type(e).__name__}: {e}")
+            if len(errors) >= IMPORT_MAX_ERRORS:
+                break
+        if rows % BULK_BATCH == 0:
+            await asyncio.sleep(0)
+    return staged, rows, errors
+
+def running_match_ids():
+    """IDs of matches a channel is still drafting, voting on or playing — never overwritten by an import."""
+    ids = {settings.get("active_game") for settings in registered_channels.values()}
+    ids.update(draft.get("id") for draft in drafts.values())
+    ids.discard(None)
+    return ids
+
+async def apply_import(kind, staged):
+    """Apply a fully validated import with one durable write, or leave everything as it was."""
+    if kind == "ratings":
+        await elo_committer.submit([(user_id, "set", elo) for user_id, elo in staged.items()])
+        return
+
+    target = queue_bans if kind == "bans" else games
+    previous = {key: target.get(key) for key in staged}
+    if kind == "bans":
+        now = time.time()
+        staged = {user_id: expiry for user_id, expiry in staged.items() if expiry > now}
+    target.update(staged)
+    try:
+        if kind == "bans":
+            save_bans()
+        else:
+            save_data()
+    except OSError:
+        for key, value in previous.items():
+            if value is None:
+                target.pop(key, None)
+            else:
+                target[key] = value
+        raise
+    if kind == "bans":
+        ban_heap[:] = [(expiry, user_id) for user_id, expiry in queue_bans.items()]
+        heapq.heapify(ban_heap)
+        schedule_ban_purge()
+
+def gzip_file(path):
+    with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+class Bulk(commands.Cog):
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def export(self, ctx, kind: str, fmt: str = "csv"):
+        """(Admin) Export ratings, bans or matches as a CSV/JSONL file."""
+        kind, fmt = kind.lower(), fmt.lower()
+        if kind not in BULK_KINDS or fmt not in ("csv", "jsonl"):
+            return await ctx.send("⚠️ Usage: `=export <ratings|bans|matches> [csv|jsonl]`")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"{kind}.{fmt}")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                count = await write_export(kind, fmt, f)
+            limit = ctx.guild.filesize_limit if ctx.guild else 25 * 1024 * 1024
+            if os.path.getsize(path) > limit:
+                # Too big to attach as-is — gzip it in a worker thread
+                await asyncio.to_thread(gzip_file, path)
+                path += ".gz"
+            await ctx.send(f"📤 Exported **{count}** {kind}.", file=discord.File(path))
+
+    @commands.has_permissions(administrator=True)
+    @commands.command(name="import")
+    async def import_data(self, ctx, kind: str):
+        """(Admin) Import ratings, bans or matches from an attached CSV/JSONL file (all or nothing)."""
+        kind = kind.lower()
+        attachment = ctx.message.attachments[0] if ctx.message.attachments else None
+        if kind not in BULK_KINDS or not attachment:
+            return await ctx.send("⚠️ Usage: `=import <ratings|bans|matches>` with a `.csv` or `.jsonl` file attached (`.gz` ok).")
+        if not attachment.filename.lower().removesuffix(".gz").endswith((".csv", ".jsonl")):
+            return await ctx.send("⚠️ The attachment must be a `.csv` or `.jsonl` file.")
+
+        suffix = os.path.basename(attachment.filename.lower())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, suffix)
+            await attachment.save(path)
+            try:
+                staged, rows, errors = await stage_import(kind, path)
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                return await ctx.send(f"❌ Couldn't read `{attachment.filename}`: {e}")
+
+        if errors:
+            return await ctx.send(
+                "❌ Import aborted, nothing was changed. First problems:\n```" + "\n".join(errors) + "```"
+            )
+        if not staged:
+            return await ctx.send("📭 The file has no rows to import.")
+        if kind == "matches":
+            # Checked right before applying (no await in between), so a match can't start in the gap
+            running = sorted(running_match_ids() & staged.keys())
+            if running:
+                return await ctx.send(
+                    "❌ Import aborted, nothing was changed. These matches are still running: "
+                    + ", ".join(f"`{match_id}`" for match_id in running[:IMPORT_MAX_ERRORS])
+                )
+        try:
+            await apply_import(kind, staged)
+        except OSError as e:
+            return await ctx.send(f"❌ Couldn't save the import, nothing was changed: {e}")
+        await ctx.send(f"📥 Imported **{len(staged)}** {kind} from {rows} rows.")
+
+
+async def setup(bot):
+    await bot.add_cog(Bulk())
@@ -0,0 +1,129 @@
+"""Match, matchmaking, event-loop and start-up reports (loaded on first use)."""
+import csv
+import io
+import math
+
+import discord
+from discord.ext import commands
+
+from loopwatch import LAG_BUCKETS_MS
+from main import LAG_THRESHOLD_MS, games, get_pool, matchmaking_enabled, mm_stats, startup_stages, watchdog
+from records import PHASES
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+def phase_durations_for(channel_id):
+    """{phase: sorted durations} over every traced match of a channel."""
+    durations = {phase: [] for phase in PHASES}
+    for game in games.values():
+        if game.channel == channel_id:
+            for phase, seconds in game.phase_durations().items():
+                durations[phase].append(seconds)
+    return {phase: sorted(values) for phase, values in durations.items() if values}
+
+
+class Stats(commands.Cog):
+    @commands.command()
+    async def mmstats(self, ctx):
+        """Show time-to-match and rating spread for this channel's matchmaking."""
+        stats = mm_stats.get(ctx.channel.id)
+        if not stats or not stats["matches"]:
+            return await ctx.send("📭 No matchmade games in this channel yet.")
+        waits = sorted(stats["waits"])
+        spreads = sorted(stats["spreads"])
+        await ctx.send(
+            f"⚖️ **Matchmaking Stats** ({stats['matches']} matches)\n"
+            f"⏱️ Time to match: median **{waits[len(waits) // 2]:.0f}s**, "
+            f"p90 **{waits[int(len(waits) * 0.9)]:.0f}s**, max **{waits[-1]:.0f}s**\n"
+            f"📏 ELO spread: median **{spreads[len(spreads) // 2]}**, max **{spreads[-1]}**\n"
+            f"👥 Waiting now: **{len(get_pool(ctx.channel.id)) if matchmaking_enabled(ctx.channel.id) else 0}**"
+        )
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def loopstats(self, ctx):
+        """(Admin) Show event-loop lag and the call sites that blocked it."""
+        if not watchdog.beats:
+            return await ctx.send("📭 No lag samples yet.")
+        p99 = watchdog.percentile_ms(99)
+        lines = [
+            f"💓 {watchdog.beats} heartbeats · p50 ≤ **{watchdog.percentile_ms(50)}ms** · "
+            f"p99 {'≤ **' + str(p99) + 'ms**' if p99 is not None else f'> **{LAG_BUCKETS_MS[-1]}ms**'} · "
+            f"max **{watchdog.max_lag * 1000:.0f}ms**"
+        ]
+        bounds = [f"≤{b}" for b in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}"]
+        lines.append("```" + "\n".join(
+            f"{bound:>6}ms {count:>8}" for bound, count in zip(bounds, watchdog.histogram) if count
+        ) + "```")
+
+        embed = discord.Embed(title="🐢 Event Loop Lag", description="\n".join(lines), color=discord.Color.orange())
+        top = watchdog.top_sites()
+        embed.add_field(
+            name=f"Top blocking call sites (> {LAG_THRESHOLD_MS}ms)",
+            value="\n".join(f"`{site}` ×{count}" for site, count in top) if top else "None caught 🎉",
+            inline=False
+        )
+        stall = next(reversed(watchdog.recent_stalls(1)), None)
+        if stall:
+            embed.add_field(
+                name=f"Latest stall: {stall['lag'] * 1000:.0f}ms, <t:{int(stall['at'])}:R>",
+                value=f"```{stall['stack'][-1000:]}```",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def phasestats(self, ctx, channel: discord.TextChannel = None):
+        """(Admin) Show p50/p90/p99 time spent in each match phase for a channel."""
+        channel = channel or ctx.channel
+        durations = phase_durations_for(channel.id)
+        if not durations:
+            return await ctx.send(f"📭 No traced matches in {channel.mention} yet.")
+
+        lines = []
+        for phase, values in durations.items():
+            lines.append(
+                f"`{phase:<13}` p50 **{percentile(values, 50):.0f}s** · p90 **{percentile(values, 90):.0f}s** · "
+                f"p99 **{percentile(values, 99):.0f}s** ({len(values)} matches)"
+            )
+        embed = discord.Embed(
+            title=f"⏱️ Match Phase Times — #{channel.name}",
+            description="\n".join(lines),
+            color=discord.Color.teal()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def exporttraces(self, ctx):
+        """(Admin) Export every match's phase timings as CSV."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["match_id", "channel", "phase", "start", "end", "seconds"])
+        for match_id, game in games.items():
+            if game.trace is None:
+                continue
+            for phase, (start, end) in game.to_json()["trace"].items():
+                writer.writerow([match_id, game.channel, phase, start, end or "", round(end - start, 3) if end else ""])
+        data = io.BytesIO(buffer.getvalue().encode())
+        await ctx.send("📤 Match phase traces:", file=discord.File(data, filename="match_traces.csv"))
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def startup(self, ctx):
+        """(Admin) Show how long each start-up stage took."""
+        lines = [f"`{stage:<16}` **{seconds * 1000:.0f}ms**" for stage, seconds in startup_stages.items()]
+        embed = discord.Embed(
+            title="🚀 Start-up Timing",
+            description="\n".join(lines) or "No stages recorded.",
+            color=discord.Color.blurple()
+        )
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(Stats())
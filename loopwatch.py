@@ -0,0 +1,123 @@
+"""
+Event-loop lag watchdog.
+
+A heartbeat task on the loop measures how late each of its sleeps wakes up. A helper
+thread watches that heartbeat; when it goes quiet for longer than the threshold, the
+loop is stuck in synchronous code and the thread grabs the loop thread's stack right
+then, so the blocking call site is caught in the act rather than after it returns.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open-ended
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopWatchdog:
+    def __init__(self, interval=0.1, threshold=0.25, keep=20):
+        self.interval = interval  # heartbeat period, seconds
+        self.threshold = threshold  # lag that counts as a stall, seconds
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.beats = 0
+        self.stalls = deque(maxlen=keep)  # [{"at", "lag", "site", "stack"}], newest last
+        self.sites = Counter()  # {"file:line in func": stalls caught there}
+        self._lock = threading.Lock()  # guards stalls/sites, written from the helper thread
+        self._last_beat = time.monotonic()
+        self._captured = None  # stall dict captured for the current beat, if any
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+
+    def start(self):
+        """Start the heartbeat and helper thread (call from the loop; no-op if already running)."""
+        if self._task and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._record(lag)
+            with self._lock:
+                stall, self._captured = self._captured, None
+                self._last_beat = now
+            if stall:
+                stall["lag"] = lag  # the full stall length is only known once the loop is back
+                print(f"🐢 Event loop blocked for {lag * 1000:.0f}ms at {stall['site']}\n{stall['stack']}")
+
+    def _record(self, lag):
+        ms = lag * 1000
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if ms <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+        self.beats += 1
+        self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval / 2)
+            with self._lock:
+                if self._captured or time.monotonic() - self._last_beat < self.interval + self.threshold:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            site = blame(stack)
+            stall = {
+                "at": time.time(),
+                "lag": time.monotonic() - self._last_beat - self.interval,
+                "site": site,
+                "stack": "".join(traceback.format_list(stack[-12:]))
+            }
+            with self._lock:
+                self._captured = stall
+                self.stalls.append(stall)
+                self.sites[site] += 1
+
+    def top_sites(self, n=5):
+        with self._lock:
+            return self.sites.most_common(n)
+
+    def recent_stalls(self, n=5):
+        with self._lock:
+            return list(self.stalls)[-n:]
+
+    def percentile_ms(self, pct):
+        """Upper bound of the histogram bucket holding the `pct` percentile (None if above the last bound)."""
+        target = pct / 100 * self.beats
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return LAG_BUCKETS_MS[i] if i < len(LAG_BUCKETS_MS) else None
+        return 0
+
+
+def blame(stack):
+    """The innermost frame in the bot's own code, else the innermost frame at all."""
+    for entry in reversed(stack):
+        if entry.filename.startswith(HERE) and not entry.filename.endswith("loopwatch.py"):
+            break
+    else:
+        entry = stack[-1]
+    return f"{os.path.basename(entry.filename)}:{entry.lineno} in {entry.name}"
+
@@ -1,4 +1,7 @@
+import time
+startup_t0 = time.perf_counter()  # start-up stages are measured from here
 import os
+import sys
 import random
 import asyncio
 from dotenv import load_dotenv
@@ -6,18 +9,41 @@ import discord
 from discord.ext import commands
 from discord.ui import View, Button
 from discord import Embed
+from records import GameRecord
+import api
+from loopwatch import LoopWatchdog
 import json
-import time
+from collections import deque
 import uuid  # for unique match IDs
+import heapq
+import bisect
+import itertools
+from contextlib import contextmanager
+
+# Extensions do `from main import ...`; when run as a script this module is __main__, so alias it
+# instead of letting that import execute main.py a second time with its own empty state
+sys.modules.setdefault("main", sys.modules[__name__])
 
 
 DATA_FILE = "queue_data.json"
 ELO_FILE = "elo_data.json"
+VOTE_FILE = "vote_state.json"  # in-flight votes; small, so rewriting it per click is cheap
 WIN_ELO = 10  # default ELO for winning a match
+VOTE_SECONDS = 10  # how long each gamemode/region/map vote stays open
+PANEL_DEBOUNCE_MS = 1500  # at most one queue panel edit per this many ms
+PICK_TIMEOUT_DEFAULT = 60  # seconds a captain gets per pick before an auto-pick
+MM_BUCKET_WIDTH = 50  # ELO span of one matchmaking bucket
+MM_BASE_WINDOW = 100  # initial +/- ELO window around the longest-waiting player
+MM_WIDEN_PER_MIN = 50  # extra ELO window per minute waited
+MM_TICK_SECONDS = 5  # how often a waiting pool is re-checked as windows widen
+LAG_THRESHOLD_MS = 250  # event-loop stalls longer than this get their stack captured
+ELO_COMMIT_WINDOW_MS = 50  # ELO transactions arriving within this window share one file write
 
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+API_PORT = os.getenv("API_PORT")  # optional; serves the read-only query API (api.py) on this port
+RECORD_FILE = os.getenv("RECORD_EVENTS")  # optional JSONL path; every command/interaction gets logged for replay.py
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -33,21 +59,154 @@ timeouts = {}  # {channel_id: inactivity_seconds}
 
 # --- Data ---
 queues = {}
-games = {}  # {match_id: {"channel": int, "players": list[int], "status": str, "map": str | None, "winner": int | None}}
+games = {}  # {match_id: GameRecord}
 registered_channels = {}
 drafts = {}
+queue_started = {}  # {channel_id: timestamp the current queue got its first player}
+# --- Scheduler ---
+class Scheduler:
+    """Shared timer service: one task sleeps until the earliest deadline in a min-heap."""
+    def __init__(self):
+        self._heap = []  # [(deadline, seq, key)], cancelled/rescheduled entries skipped lazily
+        self._entries = {}  # {key: (deadline, seq, callback)}
+        self._seq = 0
+        self._wakeup = None
+        self._task = None
+
+    def call_at(self, deadline, key, callback):
+        """Run coroutine function `callback` at `deadline` (epoch seconds), replacing any timer under `key`."""
+        self._seq += 1
+        self._entries[key] = (deadline, self._seq, callback)
+        heapq.heappush(self._heap, (deadline, self._seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(d, s, k) for k, (d, s, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif self._heap[0][1] == self._seq:
+            self._wakeup.set()  # new earliest deadline
+
+    def cancel(self, key):
+        self._entries.pop(key, None)
+
+    def deadline(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, key = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                if not entry or entry[1] != seq:
+                    continue
+                del self._entries[key]
+                asyncio.create_task(self._fire(key, entry[2]))
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, key, callback):
+        try:
+            await callback()
+        except Exception as e:
+            print(f"⚠️ Scheduled task {key!r} failed: {e!r}")
+
+scheduler = Scheduler()
+
 # --- Queue Ban System ---
+BAN_FILE = "queue_bans.json"
+BAN_JOURNAL = "queue_bans.log"  # append-only changes since the last BAN_FILE snapshot
 queue_bans = {}  # {user_id: ban_expiry_timestamp}
+ban_heap = []  # [(ban_expiry_timestamp, user_id)] min-heap, stale entries skipped lazily
+ban_journal_lines = 0
 
 def save_bans():
-    with open("queue_bans.json", "w") as f:
+    """Snapshot active bans and truncate the journal."""
+    global ban_journal_lines
+    with open(BAN_FILE, "w") as f:
         json.dump(queue_bans, f, indent=2)
+    open(BAN_JOURNAL, "w").close()
+    ban_journal_lines = 0
+
+def journal_ban(user_id, expiry):
+    """Persist one ban change (expiry None = unban), compacting once the journal outgrows the snapshot."""
+    global ban_journal_lines
+    with open(BAN_JOURNAL, "a") as f:
+        f.write(json.dumps({"user": user_id, "expiry": expiry}) + "\n")
+    ban_journal_lines += 1
+    if ban_journal_lines > max(64, 2 * len(queue_bans)):
+        save_bans()
 
 def load_bans():
-    global queue_bans
-    if os.path.exists("queue_bans.json"):
-        with open("queue_bans.json", "r") as f:
-            queue_bans = {int(k): v for k, v in json.load(f).items()}
+    bans = {}
+    if os.path.exists(BAN_FILE):
+        with open(BAN_FILE, "r") as f:
+            bans = {int(k): v for k, v in json.load(f).items()}
+    if os.path.exists(BAN_JOURNAL):
+        with open(BAN_JOURNAL, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final write
+                if entry["expiry"] is None:
+                    bans.pop(entry["user"], None)
+                else:
+                    bans[entry["user"]] = entry["expiry"]
+    now = time.time()
+    queue_bans.clear()
+    queue_bans.update((uid, expiry) for uid, expiry in bans.items() if expiry > now)
+    ban_heap[:] = [(expiry, uid) for uid, expiry in queue_bans.items()]
+    heapq.heapify(ban_heap)
+    save_bans()
+    schedule_ban_purge()
+
+def ban_remaining(user_id):
+    """Seconds left on a user's queue ban, or 0 if not banned."""
+    expiry = queue_bans.get(user_id)
+    if not expiry:
+        return 0
+    return max(0, expiry - time.time())
+
+def add_ban(user_id, expiry):
+    queue_bans[user_id] = expiry
+    heapq.heappush(ban_heap, (expiry, user_id))
+    if len(ban_heap) > 2 * len(queue_bans) + 64:
+        ban_heap[:] = [(e, uid) for uid, e in queue_bans.items()]
+        heapq.heapify(ban_heap)
+    journal_ban(user_id, expiry)
+    schedule_ban_purge()
+
+def remove_ban(user_id):
+    if queue_bans.pop(user_id, None) is not None:
+        journal_ban(user_id, None)
+
+def schedule_ban_purge():
+    """Arm the scheduler for the earliest live ban expiry."""
+    while ban_heap and queue_bans.get(ban_heap[0][1]) != ban_heap[0][0]:
+        heapq.heappop(ban_heap)  # unbanned or re-banned since
+    if ban_heap:
+        scheduler.call_at(ban_heap[0][0], "ban_purge", purge_expired_bans)
+
+async def purge_expired_bans():
+    """Drop every ban whose expiry has passed (scheduled unban)."""
+    now = time.time()
+    while ban_heap and ban_heap[0][0] <= now:
+        expiry, user_id = heapq.heappop(ban_heap)
+        if queue_bans.get(user_id) == expiry:
+            del queue_bans[user_id]
+    # Expired entries need no journal record — load_bans drops them anyway
+    schedule_ban_purge()
+
+def active_bans():
+    """Active bans as [(user_id, expiry)], soonest expiry first."""
+    return sorted(queue_bans.items(), key=lambda x: x[1])
 
 
 # --- Helper functions ---
@@ -58,34 +217,176 @@ def find_user_in_queues(user_id):
             return channel_id
     return None
 
+def dequeue(channel_id, user_id):
+    """Remove a user from a channel's queue (and its matchmaking pool, if any)."""
+    queue = queues.get(channel_id, [])
+    if user_id in queue:
+        queue.remove(user_id)
+        fed_adjust(channel_id, -1)
+    if not queue:
+        queue_started.pop(channel_id, None)
+    pool = mm_pools.get(channel_id)
+    if pool:
+        pool.remove(user_id)
+
 def save_data():
     data = {
         "registered_channels": registered_channels,
         "queues": queues,
-        "games": games
+        "games": {match_id: game.to_json() for match_id, game in games.items()},
+        "drafts": drafts
     }
     with open(DATA_FILE, "w") as f:
         json.dump(data, f, indent=2)
+    publish_state(data)
+
+def save_votes():
+    """Persist in-flight votes apart from queue_data.json, so a click doesn't rewrite the game history."""
+    # Written aside and swapped in like save_elo: a crash mid-write must not leave JSON that breaks start-up
+    tmp = VOTE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({ch: view.to_json() for ch, view in active_votes.items()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, VOTE_FILE)
+
+def publish_state(data):
+    """Hand the query API a fresh snapshot; only the copies made here are shared with its thread."""
+    api.snapshots.publish(
+        queues=queue_snapshot(),
+        games=data["games"],  # freshly built by to_json(), never touched again by the bot
+        drafts=json.loads(json.dumps(drafts))
+    )
+
+def queue_snapshot():
+    return {str(ch): list(members) for ch, members in queues.items()}
+
+def publish_queues():
+    """Publish queue changes that don't go through save_data() (joins, leaves)."""
+    api.snapshots.publish(queues=queue_snapshot())
 
-if os.path.exists(ELO_FILE):
-    with open(ELO_FILE, "r") as f:
-        elo_data = json.load(f)
-else:
-    elo_data = {}
+elo_data = {}
+
+def load_elo():
+    elo_data.clear()
+    if os.path.exists(ELO_FILE):
+        with open(ELO_FILE, "r") as f:
+            elo_data.update(json.load(f))
 
 def save_elo():
-    with open(ELO_FILE, "w") as f:
+    # Write a temp file and swap it in, so a crash never leaves a half-written ELO file
+    tmp = ELO_FILE + ".tmp"
+    with open(tmp, "w") as f:
         json.dump(elo_data, f, indent=2)
-        
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ELO_FILE)
+    api.snapshots.publish(elo=dict(elo_data))
+    if season_job:
+        # The ELO file now holds every rolled-over chunk so far — resume from here after a crash
+        season_job["saved_cursor"] = season_job.get("cursor", 0)
+        save_season_job()
+
+# --- ELO Transactions ---
+class EloCommitter:
+    """Group commit for ELO changes: every transaction submitted within one window shares a single save_elo()."""
+    def __init__(self, window_ms=ELO_COMMIT_WINDOW_MS):
+        self.window = window_ms / 1000
+        self._pending = []  # [(ops, played, future)]
+        self._task = None
+        self.commits = 0
+        self.transactions = 0
+
+    async def submit(self, ops, played=()):
+        """Apply `ops` — [(user_id, "add"|"set", amount)] — all-or-nothing; returns {user_id: new ELO} once on disk.
+
+        `played` user IDs get their season last_played stamped, saved once per batch alongside the ELO file.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((ops, played, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._pending:
+            await asyncio.sleep(self.window)  # let concurrent results join this batch
+            batch, self._pending = self._pending, []
+            self._commit(batch)
+
+    def _commit(self, batch):
+        undo = {}  # {user_id: value before this batch, None = no entry}
+        results = []
+        for ops, _, _ in batch:
+            staged = {}
+            for user_id, action, amount in ops:
+                current = staged.get(user_id, elo_data.get(user_id, 0))
+                staged[user_id] = max(0, current + amount if action == "add" else amount)
+            for user_id in staged:
+                undo.setdefault(user_id, elo_data.get(user_id))
+            elo_data.update(staged)
+            results.append(staged)
+
+        try:
+            save_elo()
+        except Exception as e:
+            # Nothing from this batch reached disk — roll the in-memory ratings back too
+            for user_id, value in undo.items():
+                if value is None:
+                    elo_data.pop(user_id, None)
+                else:
+                    elo_data[user_id] = value
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        played = [user_id for _, users, _ in batch for user_id in users]
+        if played:
+            now = time.time()
+            season_data["last_played"].update((user_id, now) for user_id in played)
+            try:
+                save_seasons()
+            except OSError as e:
+                # Ratings are already durable; activity stays in memory and goes out with the next save
+                print(f"⚠️ Couldn't save season activity: {e!r}")
+
+        self.commits += 1
+        self.transactions += len(batch)
+        for (_, _, future), staged in zip(batch, results):
+            if not future.done():
+                future.set_result(staged)
+
+elo_committer = EloCommitter()
+
 def load_data():
-    global registered_channels, queues, games
+    # Refill the dicts in place: extensions hold references to them
     if os.path.exists(DATA_FILE):
         with open(DATA_FILE, "r") as f:
             data = json.load(f)
-            registered_channels = {int(k): v for k, v in data.get("registered_channels", {}).items()}
-            queues = {int(k): v for k, v in data.get("queues", {}).items()}
-            games = data.get("games", {})
-            load_bans()
+        registered_channels.clear()
+        registered_channels.update((int(k), v) for k, v in data.get("registered_channels", {}).items())
+        queues.clear()
+        queues.update((int(k), v) for k, v in data.get("queues", {}).items())
+        games.clear()
+        games.update((match_id, GameRecord.from_json(g)) for match_id, g in data.get("games", {}).items())
+        # JSON turns the int captain keys into strings — convert them back
+        drafts.clear()
+        drafts.update(
+            (int(k), {**d, "teams": {int(c): m for c, m in d["teams"].items()}})
+            for k, d in data.get("drafts", {}).items()
+        )
+        pending_votes.clear()
+        pending_votes.update((int(k), v) for k, v in data.get("votes", {}).items())  # saves from before VOTE_FILE
+    if os.path.exists(VOTE_FILE):
+        with open(VOTE_FILE, "r") as f:
+            pending_votes.clear()
+            pending_votes.update((int(k), v) for k, v in json.load(f).items())
+    rebuild_federation()
+    load_bans()
+    load_seasons()
+    publish_state({"games": {match_id: game.to_json() for match_id, game in games.items()}})
+    api.snapshots.publish(elo=dict(elo_data))
 
 def is_registered(ctx):
     return ctx.channel.id in registered_channels
@@ -104,57 +405,379 @@ def get_all_players(channel_id):
     all_players.extend(draft["teams"].keys())  # include captains
     return all_players
 
-# --- Queue Commands ---
-@bot.command(aliases=["t"])
-async def teams(ctx, game_id: str = None):
-    """Show teams for the current channel or a specific game ID."""
-    channel_id = ctx.channel.id
+# --- Live Queue Panel ---
+panel_tasks = {}  # {channel_id: pending panel edit task}
 
-    # Check if a specific game ID was provided
-    if game_id:
-        game = games.get(game_id)
-        if not game:
-            return await ctx.send(f"❌ No game found with ID `{game_id}`.")
-        channel_id = game["channel"]
-        # Find the draft/teams structure (if exists)
-        draft = drafts.get(channel_id)
-        if draft:
-            team_data = draft["teams"]
-        else:
-            team_data = game.get("teams", {})
-        title = f"📋 Teams for Game `{game_id}`"
+def queue_panel_enabled(channel_id):
+    return registered_channels.get(channel_id, {}).get("panel", False)
+
+def build_queue_panel(channel_id):
+    """Build the embed shown on a channel's pinned queue panel."""
+    queue = queues.get(channel_id, [])
+    size = registered_channels[channel_id]["size"]
+    members = [f"<@{m_id}>" for m_id in queue]
+    return discord.Embed(
+        title=f"🎯 Current Queue ({len(queue)}/{size})",
+        description="\n".join(members) if members else "🕳️ The queue is empty.",
+        color=discord.Color.blurple()
+    )
+
+def schedule_panel_update(channel):
+    """Queue a debounced panel edit; bursts of changes collapse into a single edit."""
+    if not queue_panel_enabled(channel.id):
+        return
+    task = panel_tasks.get(channel.id)
+    if task and not task.done():
+        return  # the pending edit will render the latest queue
+    panel_tasks[channel.id] = asyncio.create_task(flush_queue_panel(channel))
+
+async def flush_queue_panel(channel):
+    await asyncio.sleep(PANEL_DEBOUNCE_MS / 1000)
+    if not queue_panel_enabled(channel.id):
+        return
+    settings = registered_channels[channel.id]
+    embed = build_queue_panel(channel.id)
+    try:
+        await channel.get_partial_message(settings["panel_message"]).edit(embed=embed)
+    except discord.NotFound:
+        # Panel was deleted — post a fresh one
+        message = await channel.send(embed=embed, view=QueuePanelView())
+        settings["panel_message"] = message.id
+        save_data()
+    except discord.HTTPException:
+        pass
+
+async def announce_queue(channel, text):
+    """Send a queue update, or fold it into the live panel when panel mode is on."""
+    publish_queues()
+    if queue_panel_enabled(channel.id):
+        schedule_panel_update(channel)
     else:
-        # Default to showing the ongoing draft in this channel
-        draft = drafts.get(channel_id)
-        if not draft:
-            # Try to find the latest game for this channel
-            latest_game = None
-            for g_id, g_data in games.items():
-                if g_data["channel"] == channel_id:
-                    latest_game = g_data
-            if not latest_game:
-                return await ctx.send("❌ No active draft or recent game found in this channel.")
-            team_data = latest_game.get("teams", {})
-            title = f"📋 Teams for Last Game (`{g_id}`)"
-        else:
-            team_data = draft["teams"]
-            title = "📋 Current Draft Teams"
+        await channel.send(text)
+
+class QueuePanelView(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)  # persistent, re-registered in on_ready
+
+    @discord.ui.button(label="Join", style=discord.ButtonStyle.success, custom_id="queue_panel:join")
+    async def join_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+        error = await try_join(interaction.channel, interaction.user)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+
+    @discord.ui.button(label="Leave", style=discord.ButtonStyle.danger, custom_id="queue_panel:leave")
+    async def leave_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+        error = await try_leave(interaction.channel, interaction.user)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
 
-    if not team_data:
-        return await ctx.send("❌ No teams found for this game or draft.")
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def queuepanel(ctx):
+    """(Admin) Toggle a pinned queue panel that is edited in place instead of posting per join."""
+    if not is_registered(ctx):
+        return await ctx.send("❌ This channel is not registered for queueing.")
+    settings = registered_channels[ctx.channel.id]
 
-    # Format output
-    embed = discord.Embed(title=title, color=discord.Color.dark_theme())
+    if settings.get("panel"):
+        settings["panel"] = False
+        message_id = settings.pop("panel_message", None)
+        save_data()
+        if message_id:
+            try:
+                await ctx.channel.get_partial_message(message_id).unpin()
+            except discord.HTTPException:
+                pass
+        return await ctx.send("📴 Queue panel disabled — queue changes will be posted as messages again.")
+
+    message = await ctx.send(embed=build_queue_panel(ctx.channel.id), view=QueuePanelView())
+    try:
+        await message.pin()
+    except discord.HTTPException:
+        pass  # missing Manage Messages, panel still works unpinned
+    settings["panel"] = True
+    settings["panel_message"] = message.id
+    save_data()
+
+# --- Matchmaking Pools ---
+mm_pools = {}  # {channel_id: MatchmakingPool}
+mm_stats = {}  # {channel_id: {"matches": int, "waits": deque, "spreads": deque}}
+
+class MatchmakingPool:
+    """One channel's queued players, indexed by ELO bucket for windowed lookups."""
+    def __init__(self):
+        self.players = {}  # {user_id: (elo, joined_at)}, insertion order = longest waiting first
+        self.buckets = {}  # {bucket: {user_id: elo}}
+        self.keys = []  # sorted non-empty bucket indexes
+
+    def __len__(self):
+        return len(self.players)
+
+    @staticmethod
+    def bucket(elo):
+        return int(elo // MM_BUCKET_WIDTH)
+
+    def add(self, user_id, elo, joined_at):
+        self.remove(user_id)
+        self.players[user_id] = (elo, joined_at)
+        key = self.bucket(elo)
+        if key not in self.buckets:
+            self.buckets[key] = {}
+            bisect.insort(self.keys, key)
+        self.buckets[key][user_id] = elo
+
+    def remove(self, user_id):
+        entry = self.players.pop(user_id, None)
+        if not entry:
+            return
+        key = self.bucket(entry[0])
+        bucket = self.buckets[key]
+        del bucket[user_id]
+        if not bucket:
+            del self.buckets[key]
+            self.keys.pop(bisect.bisect_left(self.keys, key))
+
+    def window(self, user_id, now):
+        elo, joined_at = self.players[user_id]
+        return MM_BASE_WINDOW + MM_WIDEN_PER_MIN * (now - joined_at) / 60
+
+    def find_match(self, size, now, max_anchors=16):
+        """Pick `size` players around the longest-waiting anchor whose widened window holds enough of them."""
+        if len(self.players) < size:
+            return None
+        for anchor in itertools.islice(self.players, max_anchors):
+            elo = self.players[anchor][0]
+            window = self.window(anchor, now)
+            lo = bisect.bisect_left(self.keys, self.bucket(elo - window))
+            hi = bisect.bisect_right(self.keys, self.bucket(elo + window))
+            if sum(len(self.buckets[k]) for k in self.keys[lo:hi]) < size:
+                continue
+            candidates = [
+                (abs(e - elo), uid)
+                for k in self.keys[lo:hi]
+                for uid, e in self.buckets[k].items()
+                if uid != anchor and abs(e - elo) <= window
+            ]
+            if len(candidates) < size - 1:
+                continue
+            return [anchor] + [uid for _, uid in heapq.nsmallest(size - 1, candidates)]
+        return None
+
+def matchmaking_enabled(channel_id):
+    return registered_channels.get(channel_id, {}).get("matchmaking", False)
+
+def get_pool(channel_id):
+    """Return the channel's pool, rebuilding it from the saved queue after a restart."""
+    pool = mm_pools.get(channel_id)
+    if pool is None:
+        pool = mm_pools[channel_id] = MatchmakingPool()
+        now = time.time()
+        for user_id in queues.get(channel_id, []):
+            pool.add(user_id, elo_data.get(str(user_id), 0), now)
+    return pool
+
+async def run_matchmaking(channel):
+    """Start a draft if the pool can form a match, and re-check later while enough players wait."""
+    if not matchmaking_enabled(channel.id):
+        return
+    pool = get_pool(channel.id)
+    size = registered_channels[channel.id]["size"]
+    now = time.time()
+    # One draft per channel: while one is running, keep the pool waiting and re-check on the next tick
+    players = pool.find_match(size, now) if channel.id not in drafts else None
+
+    if players:
+        elos = [pool.players[uid][0] for uid in players]
+        waits = [now - pool.players[uid][1] for uid in players]
+        stats = mm_stats.setdefault(channel.id, {"matches": 0, "waits": deque(maxlen=1000), "spreads": deque(maxlen=1000)})
+        stats["matches"] += 1
+        stats["waits"].extend(waits)
+        stats["spreads"].append(max(elos) - min(elos))
+
+        for user_id in players:
+            dequeue(channel.id, user_id)
+        # Register the draft before the first await, so a join landing meanwhile can't match over it
+        open_draft(channel, players, queued_since=now - max(waits))
+        schedule_panel_update(channel)
+        await channel.send(f"🎯 Matched {size} players within **{max(elos) - min(elos)} ELO**!")
+        await announce_draft(channel)
+
+    if len(pool) >= size:
+        scheduler.call_at(now + MM_TICK_SECONDS, ("matchmaking", channel.id), lambda: run_matchmaking(channel))
+    else:
+        scheduler.cancel(("matchmaking", channel.id))
+
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def matchmaking(ctx):
+    """(Admin) Toggle ELO-window matchmaking instead of first-come queue fills for this channel."""
+    if not is_registered(ctx):
+        return await ctx.send("❌ This channel is not registered for queueing.")
+    settings = registered_channels[ctx.channel.id]
+    if not settings.get("matchmaking") and settings.get("federated"):
+        return await ctx.send("⚠️ Turn off `=federate` here first — a channel can't use both.")
+    settings["matchmaking"] = not settings.get("matchmaking", False)
+    save_data()
+    if not settings["matchmaking"]:
+        mm_pools.pop(ctx.channel.id, None)
+        scheduler.cancel(("matchmaking", ctx.channel.id))
+        return await ctx.send("📴 Matchmaking disabled — the queue fills first-come, first-served again.")
+    await ctx.send(
+        f"⚖️ Matchmaking enabled — matches form within ±{MM_BASE_WINDOW} ELO, "
+        f"widening by {MM_WIDEN_PER_MIN} ELO per minute waited."
+    )
+    await run_matchmaking(ctx.channel)
+
+# --- Federated Queues ---
+fed_counts = {}  # {size: players queued across every federated channel of that size}
+fed_channels = {}  # {size: {channel_id}} federated channels feeding each pool
+
+def federated(channel_id):
+    return registered_channels.get(channel_id, {}).get("federated", False)
+
+def rebuild_federation():
+    """Recount every pool from the queues (on load, and when a channel joins, leaves or resizes a pool)."""
+    fed_counts.clear()
+    fed_channels.clear()
+    for channel_id, settings in registered_channels.items():
+        if settings.get("federated"):
+            size = settings["size"]
+            fed_channels.setdefault(size, set()).add(channel_id)
+            fed_counts[size] = fed_counts.get(size, 0) + len(queues.get(channel_id, []))
+
+def fed_adjust(channel_id, delta):
+    """O(1) pool bookkeeping for one join (+1) or leave (-1) in a federated channel."""
+    settings = registered_channels.get(channel_id)
+    if settings and settings.get("federated"):
+        fed_counts[settings["size"]] = fed_counts.get(settings["size"], 0) + delta
+
+def fed_status(channel_id):
+    size = registered_channels[channel_id]["size"]
+    return f"{fed_counts.get(size, 0)}/{size} across {len(fed_channels.get(size, ()))} channels"
+
+async def run_federation(size):
+    """Start matches while the pool for `size` holds enough players, hosted where most of them queue."""
+    while fed_counts.get(size, 0) >= size:
+        # Host in the idle channel holding the most players; if every channel has a draft running,
+        # leave the players pooled — winner/endgame re-run this once a match ends
+        idle = [ch for ch in fed_channels.get(size, ()) if ch not in drafts and bot.get_channel(ch)]
+        if not idle:
+            return
+        host = bot.get_channel(max(idle, key=lambda ch: len(queues.get(ch, []))))
+        ranked = sorted(
+            (ch for ch in fed_channels.get(size, ()) if queues.get(ch)),
+            key=lambda ch: (ch == host.id, len(queues[ch])),
+            reverse=True
+        )
+
+        players = []
+        taken = {}  # {channel_id: [user_id]} players pulled from each channel
+        for channel_id in ranked:
+            for user_id in queues[channel_id][:size - len(players)]:
+                players.append(user_id)
+                taken.setdefault(channel_id, []).append(user_id)
+            if len(players) >= size:
+                break
+        queued_since = min(queue_started.get(ch, time.time()) for ch in taken)
+        for channel_id, user_ids in taken.items():
+            for user_id in user_ids:
+                dequeue(channel_id, user_id)
+        # Claim the host before the first await, so a join landing meanwhile sees it as busy
+        open_draft(host, players, queued_since=queued_since)
+
+        for channel_id, user_ids in taken.items():
+            channel = bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            if channel_id != host.id:
+                mentions = " ".join(f"<@{uid}>" for uid in user_ids)
+                await channel.send(f"🔀 Match found! {mentions} — head to {host.mention} for the draft.")
+            schedule_panel_update(channel)
+
+        await host.send(f"🔀 Federated pool filled — starting a match here with players from {len(taken)} channel(s)!")
+        await announce_draft(host)
+
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def federate(ctx):
+    """(Admin) Toggle feeding this channel's queue into one pool shared by every federated channel of the same size."""
+    if not is_registered(ctx):
+        return await ctx.send("❌ This channel is not registered for queueing.")
+    settings = registered_channels[ctx.channel.id]
+    if not settings.get("federated") and settings.get("matchmaking"):
+        return await ctx.send("⚠️ Turn off `=matchmaking` here first — a channel can't use both.")
+    settings["federated"] = not settings.get("federated", False)
+    rebuild_federation()
+    save_data()
+    if not settings["federated"]:
+        return await ctx.send("📴 Federation disabled — this channel's queue fills on its own again.")
+    await ctx.send(
+        f"🔀 Federation enabled — this queue now shares a {settings['size']}-player pool "
+        f"({fed_status(ctx.channel.id)})."
+    )
+    await run_federation(settings["size"])
+
+# --- Event Loop Watchdog ---
+watchdog = LoopWatchdog(threshold=LAG_THRESHOLD_MS / 1000)
+
+# --- Match Lifecycle Tracing ---
+def trace_phase(channel_id, phase):
+    """Move the channel's active match into `phase` (ends the phase it was in)."""
+    match_id = registered_channels.get(channel_id, {}).get("active_game")
+    game = games.get(match_id)
+    if game:
+        game.begin_phase(phase, time.time())
+
+# --- Match View ---
+match_views = {}  # {match_id: (version, Embed)} — rendered teams/map/region/gamemode embed
+match_versions = {}  # {match_id: state version}, bumped by every change the embed shows
+
+def invalidate_match_view(match_id):
+    """Mark a match's cached embed stale (picks, subs, vote results)."""
+    if match_id:
+        match_versions[match_id] = match_versions.get(match_id, 0) + 1
+
+def drop_match_view(match_id):
+    match_views.pop(match_id, None)
+    match_versions.pop(match_id, None)
+
+def match_teams(match_id):
+    """{captain_id: [member_ids]} for a match: the live draft if it's still running, else the saved teams."""
+    game = games.get(match_id)
+    if not game:
+        return {}
+    draft = drafts.get(game.channel)
+    if draft and draft.get("id") == match_id:
+        return draft["teams"]
+    return game.teams or {}
+
+async def render_match_view(guild, match_id):
+    """The match's teams/details embed, rebuilt only when its state version changed (None if no teams)."""
+    version = match_versions.get(match_id, 0)
+    cached = match_views.get(match_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    game = games.get(match_id)
+    team_data = match_teams(match_id)
+    if not game or not team_data:
+        return None
+
+    embed = discord.Embed(title=f"🎮 Match `{match_id}`", color=discord.Color.dark_theme())
     for captain_id, members in team_data.items():
-        try:
-            captain = await ctx.guild.fetch_member(captain_id)
-            captain_name = captain.display_name
-        except:
-            captain_name = f"Unknown ({captain_id})"
+        captain = guild.get_member(captain_id)
+        if captain is None:
+            try:
+                captain = await guild.fetch_member(captain_id)
+            except discord.HTTPException:
+                pass
+        captain_name = captain.display_name if captain else f"Unknown ({captain_id})"
 
         member_mentions = []
         for m_id in members:
-            member = ctx.guild.get_member(m_id)
+            member = guild.get_member(m_id)
             member_mentions.append(member.mention if member else f"<@{m_id}>")
 
         embed.add_field(
@@ -163,74 +786,140 @@ async def teams(ctx, game_id: str = None):
             inline=False
         )
 
+    if game.gamemode or game.region or game.map:
+        embed.add_field(name="- 🗺️ Map", value=game.map or "TBD", inline=True)
+        embed.add_field(name="- 🌎 Region", value=game.region or "TBD", inline=True)
+        embed.add_field(name="- 🎮 Gamemode", value=game.gamemode or "TBD", inline=True)
+
+    # Stored under the version read up front: a change during fetch_member makes this entry stale.
+    # Only live matches are cached — lookups of finished games would otherwise pile up forever.
+    if game.status != "finished":
+        match_views[match_id] = (version, embed)
+    return embed
+
+# --- Queue Commands ---
+@bot.command(aliases=["t"])
+async def teams(ctx, game_id: str = None):
+    """Show teams for the current channel or a specific game ID."""
+    if game_id:
+        if game_id not in games:
+            return await ctx.send(f"❌ No game found with ID `{game_id}`.")
+        match_id = game_id
+    else:
+        # Default to the ongoing draft in this channel, else the channel's latest game
+        draft = drafts.get(ctx.channel.id)
+        match_id = draft.get("id") if draft else None
+        if not match_id:
+            for g_id, g_data in games.items():
+                if g_data.channel == ctx.channel.id:
+                    match_id = g_id
+            if not match_id:
+                return await ctx.send("❌ No active draft or recent game found in this channel.")
+
+    embed = await render_match_view(ctx.guild, match_id)
+    if embed is None:
+        return await ctx.send("❌ No teams found for this game or draft.")
     await ctx.send(embed=embed)
 
-@bot.command(aliases=["j"])
-async def join(ctx):
-    """Join the queue, but only one queue per user globally."""
-        # --- Check if user is queue-banned ---
-    now = time.time()
-    ban_expiry = queue_bans.get(ctx.author.id)
-    if ban_expiry and now < ban_expiry:
-        remaining = int((ban_expiry - now) / 60)
-        return await ctx.send(f"🚫 You are queue-banned for another **{remaining} minute(s)**.")
+async def try_join(channel, user):
+    """Add a user to a channel's queue. Returns an error message, or None on success."""
+    # --- Check if user is queue-banned ---
+    ban_left = ban_remaining(user.id)
+    if ban_left:
+        remaining = int(ban_left / 60)
+        return f"🚫 You are queue-banned for another **{remaining} minute(s)**."
 
-    if not is_registered(ctx):
-        return await ctx.send("❌ This channel is not registered for queueing.")
+    if channel.id not in registered_channels:
+        return "❌ This channel is not registered for queueing."
 
-    queue = get_queue(ctx)
-    size = registered_channels[ctx.channel.id]["size"]
+    queue = queues.setdefault(channel.id, [])
+    size = registered_channels[channel.id]["size"]
 
     # Check if the user is already queued elsewhere
-    existing_channel = find_user_in_queues(ctx.author.id)
-    if existing_channel and existing_channel != ctx.channel.id:
-        return await ctx.send(
-            f"🚫 You’re already in a queue in <#{existing_channel}>. Leave there first with `=leave`."
-        )
+    existing_channel = find_user_in_queues(user.id)
+    if existing_channel and existing_channel != channel.id:
+        return f"🚫 You’re already in a queue in <#{existing_channel}>. Leave there first with `=leave`."
 
     # Prevent duplicate joins in same channel
-    if ctx.author.id in queue:
-        return await ctx.send("You're already in the queue!")
+    if user.id in queue:
+        return "You're already in the queue!"
+
+    queue_started.setdefault(channel.id, time.time())
+    if matchmaking_enabled(channel.id):
+        queue.append(user.id)
+        get_pool(channel.id).add(user.id, elo_data.get(str(user.id), 0), time.time())
+        await announce_queue(channel, f"✅ {user.mention} joined the matchmaking pool! ({len(queue)} waiting)")
+        await run_matchmaking(channel)
+        return None
+
+    if federated(channel.id):
+        queue.append(user.id)
+        fed_adjust(channel.id, 1)
+        await announce_queue(channel, f"✅ {user.mention} joined the federated queue! ({fed_status(channel.id)})")
+        await run_federation(size)
+        save_data()
+        return None
 
     # If queue is full, start the match and clear it
     if len(queue) >= size:
-        await ctx.send("⚠️ Current queue is full — starting a new match!")
-        await start_draft(ctx, queue.copy())
-        queues[ctx.channel.id] = []
+        await channel.send("⚠️ Current queue is full — starting a new match!")
+        await start_draft(channel, queue.copy())
+        queues[channel.id] = []
         save_data()
 
     # Add player (to possibly new queue)
-    queue = get_queue(ctx)
-    queue.append(ctx.author.id)
-    await ctx.send(f"✅ {ctx.author.mention} joined the queue! ({len(queue)}/{size})")
+    queue = queues.setdefault(channel.id, [])
+    queue_started.setdefault(channel.id, time.time())
+    queue.append(user.id)
+    await announce_queue(channel, f"✅ {user.mention} joined the queue! ({len(queue)}/{size})")
 
     # Start new match if queue fills up after join
     if len(queue) >= size:
-        await start_draft(ctx, queue.copy())
-        queues[ctx.channel.id] = []
+        await start_draft(channel, queue.copy())
+        queues[channel.id] = []
         save_data()
+        schedule_panel_update(channel)
+    return None
 
+async def try_leave(channel, user):
+    """Remove a user from a channel's queue. Returns an error message, or None on success."""
+    queue = queues.setdefault(channel.id, [])
+    if user.id not in queue:
+        return "You're not in the queue."
+    dequeue(channel.id, user.id)
+    await announce_queue(channel, f"👋 {user.mention} left the queue. You can now join another queue!")
+    save_data()
+    return None
+
+@bot.command(aliases=["j"])
+async def join(ctx):
+    """Join the queue, but only one queue per user globally."""
+    error = await try_join(ctx.channel, ctx.author)
+    if error:
+        await ctx.send(error)
 
 
 @bot.command(aliases=["l"])
 async def leave(ctx):
     """Leave the queue."""
-    queue = get_queue(ctx)
-    if ctx.author.id not in queue:
-        return await ctx.send("You're not in the queue.")
-    queue.remove(ctx.author.id)
-    await ctx.send(f"👋 {ctx.author.mention} left the queue. You can now join another queue!")
-    save_data()
+    error = await try_leave(ctx.channel, ctx.author)
+    if error:
+        await ctx.send(error)
 
 
 @bot.command(aliases=["q"])
 async def queue(ctx):
     """Show queue members."""
+    if queue_panel_enabled(ctx.channel.id):
+        schedule_panel_update(ctx.channel)
+        message = ctx.channel.get_partial_message(registered_channels[ctx.channel.id]["panel_message"])
+        return await ctx.send(f"📌 The live queue is pinned here: {message.jump_url}")
     queue = get_queue(ctx)
     if not queue:
         return await ctx.send("🕳️ The queue is empty.")
     members = [f"<@{m_id}>" for m_id in queue]
-    await ctx.send("🎯 **Current Queue:**\n" + "\n".join(members))
+    pool = f"\n🔀 Federated pool: {fed_status(ctx.channel.id)}" if federated(ctx.channel.id) else ""
+    await ctx.send("🎯 **Current Queue:**\n" + "\n".join(members) + pool)
     
 @bot.command()
 async def gameslist(ctx, count: int = 5):
@@ -240,8 +929,8 @@ async def gameslist(ctx, count: int = 5):
     recent = list(games.items())[-count:]
     lines = []
     for match_id, info in recent:
-        status = info["status"]
-        map_name = info.get("map", "Unknown")
+        status = info.status
+        map_name = info.map or "Unknown"
         lines.append(f"`{match_id}` — {status} — Map: **{map_name}**")
     await ctx.send("🎮 **Recent Games:**\n" + "\n".join(lines))
 
@@ -254,52 +943,188 @@ async def queueban(ctx, member: discord.Member, minutes: int = 10):
     Running again while banned will unban them.
     """
     user_id = member.id
-    now = time.time()
 
     # If already banned -> unban them
-    if user_id in queue_bans and now < queue_bans[user_id]:
-        queue_bans.pop(user_id, None)
-        save_bans()
+    if ban_remaining(user_id):
+        remove_ban(user_id)
         return await ctx.send(f"✅ {member.mention} has been **unbanned** from queueing.")
 
     # Otherwise, apply a new ban
-    expiry = now + (minutes * 60)
-    queue_bans[user_id] = expiry
-    save_bans()
+    add_ban(user_id, time.time() + (minutes * 60))
 
     await ctx.send(f"🚷 {member.mention} is now **queue-banned** for {minutes} minute(s).")
 
     # Remove them from any queue they're currently in
     for ch_id, queue in queues.items():
         if user_id in queue:
-            queue.remove(user_id)
+            dequeue(ch_id, user_id)
             channel = bot.get_channel(ch_id)
             if channel:
                 await channel.send(f"🧹 {member.mention} was removed from the queue due to a queue ban.")
+                schedule_panel_update(channel)
     save_data()
 
 @commands.has_permissions(administrator=True)
 @bot.command()
-async def resetelo(ctx):
-    """(Admin) Reset ELO for all players to 1000."""
-    data_file = "elo_data.json"
-    elos = {}
+async def queuebans(ctx):
+    """(Admin) List active queue bans, soonest expiry first."""
+    bans = active_bans()
+    if not bans:
+        return await ctx.send("✅ No active queue bans.")
+    now = time.time()
+    lines = [f"<@{uid}> — **{max(1, int((expiry - now) // 60))} min** left" for uid, expiry in bans[:20]]
+    if len(bans) > 20:
+        lines.append(f"...and {len(bans) - 20} more")
+    await ctx.send("🚷 **Active Queue Bans:**\n" + "\n".join(lines))
+
+# --- Seasons ---
+SEASON_FILE = "season_data.json"  # {"season": int, "last_played": {user_id: timestamp}, "tracking_since": timestamp}
+SEASON_JOB_FILE = "season_job.json"  # present only while a rollover is running
+SEASON_DIR = "seasons"  # archived ratings, one file per finished season
+SEASON_CHUNK = 500  # players updated between yields to the event loop
+SEASON_SAVE_EVERY = 20  # chunks between durable ELO saves during a rollover
+SEASON_SOFT_FACTOR = 0.5  # soft reset keeps this share of each rating
+SEASON_DECAY_RATE = 0.1  # decay removes this share from inactive players
+SEASON_INACTIVE_DAYS = 14
+
+season_data = {"season": 1, "last_played": {}}
+season_job = None  # {"season", "mode", "value", "started", "channel", "archived", "cursor", "saved_cursor"}
+season_task = None
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def write_json(path, data):
+    # Temp file + swap, so an interrupted write never leaves a torn season file behind
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_seasons():
+    global season_data, season_job
+    if os.path.exists(SEASON_FILE):
+        season_data = read_json(SEASON_FILE)
+    if "tracking_since" not in season_data:
+        # Players without a last_played entry haven't played since at least this moment
+        season_data["tracking_since"] = time.time()
+        save_seasons()
+    if os.path.exists(SEASON_JOB_FILE) and season_job is None:
+        season_job = read_json(SEASON_JOB_FILE)
+
+def save_seasons():
+    write_json(SEASON_FILE, season_data)
+
+def save_season_job():
+    write_json(SEASON_JOB_FILE, season_job)
+
+def season_transform(job, user_id, elo):
+    """New rating for one player's archived rating under the job's rollover mode."""
+    if job["mode"] == "hard":
+        return 0
+    if job["mode"] == "soft":
+        return round(elo * job["value"])
+    last = season_data["last_played"].get(user_id, season_data.get("tracking_since", job["started"]))
+    if job["started"] - last > SEASON_INACTIVE_DAYS * 86400:
+        return round(elo * (1 - job["value"]))
+    return elo
+
+async def run_season_rollover():
+    """Archive the season, then rewrite every rating in chunks; resumes from the last durable save."""
+    global season_job
+    job = season_job
+    if not job.get("archived"):
+        os.makedirs(SEASON_DIR, exist_ok=True)
+        await asyncio.to_thread(write_json, job["archive"], dict(elo_data))
+        job["archived"] = True
+        save_season_job()
+
+    archive = await asyncio.to_thread(read_json, job["archive"])
+    keys = sorted(archive)
+    job["cursor"] = job.get("saved_cursor", 0)  # anything past the last ELO save never reached disk
+    chunks_done = 0
+    while job["cursor"] < len(keys):
+        for user_id in keys[job["cursor"]:job["cursor"] + SEASON_CHUNK]:
+            archived = archive[user_id]
+            # Keep ELO won or lost while the rollover was running
+            current = elo_data.get(user_id, archived)
+            elo_data[user_id] = max(0, season_transform(job, user_id, archived) + current - archived)
+        job["cursor"] = min(len(keys), job["cursor"] + SEASON_CHUNK)
+        chunks_done += 1
+        if chunks_done % SEASON_SAVE_EVERY == 0:
+            save_elo()
+        await asyncio.sleep(0)
 
-    # Optionally, you can initialize all registered users to 0
-    for channel_id in registered_channels.keys():
-        queue = queues.get(channel_id, [])
-        for user_id in queue:
-            elos[str(user_id)] = 0
-        # Include players in drafts/games
-        draft_players = get_all_players(channel_id)
-        for user_id in draft_players:
-            elos[str(user_id)] = 0
+    save_elo()
+    season_data["season"] = job["season"] + 1
+    save_seasons()
+    season_job = None
+    os.remove(SEASON_JOB_FILE)
+
+    channel = bot.get_channel(job.get("channel"))
+    if channel:
+        await channel.send(
+            f"🏁 **Season {job['season']} is over!** Ratings archived and {len(keys)} players rolled over "
+            f"— welcome to **Season {season_data['season']}**."
+        )
+
+async def start_season_rollover(ctx, mode, value):
+    global season_job
+    if season_job:
+        return await ctx.send(
+            f"⏳ A rollover is already running ({season_job.get('cursor', 0)}/{len(elo_data)} players)."
+        )
+    season = season_data["season"]
+    season_job = {
+        "season": season,
+        "mode": mode,
+        "value": value,
+        "started": time.time(),
+        "channel": ctx.channel.id,
+        "archive": os.path.join(SEASON_DIR, f"season_{season}.json"),
+        "archived": False,
+        "cursor": 0,
+        "saved_cursor": 0
+    }
+    save_season_job()
+    await ctx.send(f"🔄 Rolling over **Season {season}** ({mode}) for {len(elo_data)} players...")
+    resume_season_rollover()
 
-    # Save empty or reset data
-    with open(data_file, "w") as f:
-        json.dump(elos, f, indent=2)
+def resume_season_rollover():
+    """Run the pending rollover job unless it's already running."""
+    global season_task
+    if season_job and (season_task is None or season_task.done()):
+        season_task = asyncio.create_task(run_season_rollover())
 
-    await ctx.send("💠 All ELO balances have been reset to 0.")
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def newseason(ctx, mode: str = "soft", value: float = None):
+    """(Admin) End the season: soft [keep share], hard, or decay [rate] for inactive players."""
+    mode = mode.lower()
+    if mode not in ("soft", "hard", "decay"):
+        return await ctx.send("⚠️ Invalid mode. Use `soft`, `hard`, or `decay`.")
+    if value is None:
+        value = SEASON_SOFT_FACTOR if mode == "soft" else SEASON_DECAY_RATE
+    if not 0 <= value <= 1:
+        return await ctx.send("⚠️ The value must be between 0 and 1.")
+    await start_season_rollover(ctx, mode, value)
+
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def resetelo(ctx):
+    """(Admin) Archive the season and reset ELO for every player to 0."""
+    await start_season_rollover(ctx, "hard", 0)
+
+@bot.command()
+async def season(ctx):
+    """Show the current season and any rollover in progress."""
+    msg = f"📅 Current season: **{season_data['season']}**"
+    if season_job:
+        msg += f"\n⏳ Rollover in progress: {season_job.get('cursor', 0)}/{len(elo_data)} players"
+    await ctx.send(msg)
 
 @commands.has_permissions(administrator=True)
 @bot.command()
@@ -311,19 +1136,13 @@ async def elo(ctx, member: discord.Member, action: str, amount: int):
     if action not in ["add", "subtract", "set"]:
         return await ctx.send("⚠️ Invalid action. Use `add`, `subtract`, or `set`.")
 
-    current = elo_data.get(user_id, 0)
-    if action == "add":
-        current += amount
-        current = max(0, current)
-    elif action == "subtract":
-        current -= amount
-        current = max(0, current)
-    elif action == "set":
-        current = amount
-        current = max(0, current)
-
-    elo_data[user_id] = current
-    save_elo()
+    if action == "subtract":
+        action, amount = "add", -amount
+    try:
+        result = await elo_committer.submit([(user_id, action, amount)])
+    except OSError as e:
+        return await ctx.send(f"❌ Couldn't save ELO, nothing was changed: {e}")
+    current = result[user_id]
     await ctx.send(f"✅ {member.mention}'s ELO is now **{current}**.")
 
     # --- Set Win ELO ---
@@ -338,6 +1157,26 @@ async def setwinelo(ctx, amount: int):
     await ctx.send(f"🏆 Winning team will now receive **{WIN_ELO} ELO** per player.")
 
 # --- Declare Winner (with auto-finish) ---
+def clear_match(channel_id, match_id):
+    """Free a channel for its next match: drop its draft, pick/vote timers and cached embed."""
+    drafts.pop(channel_id, None)
+    drop_match_view(match_id)
+    scheduler.cancel(("pick", channel_id))
+    scheduler.cancel(("vote", channel_id))
+    view = active_votes.pop(channel_id, None)
+    if view:
+        view.ended = True
+        view.stop()
+        save_votes()
+    if channel_id in registered_channels:
+        registered_channels[channel_id]["active_game"] = None
+
+async def refill_channel(channel):
+    """A match ended here: start whatever the matchmaking or federated pool was holding back."""
+    await run_matchmaking(channel)
+    if federated(channel.id):
+        await run_federation(registered_channels[channel.id]["size"])
+
 @commands.has_permissions(administrator=True)
 @bot.command()
 async def winner(ctx, captain: discord.Member):
@@ -360,17 +1199,13 @@ async def winner(ctx, captain: discord.Member):
             losers.append(cpt)
             losers.extend(members)
 
-    # --- Apply ELO changes ---
-    for user_id in winners:
-        user_id_str = str(user_id)
-        elo_data[user_id_str] = elo_data.get(user_id_str, 0) + WIN_ELO
-
-    for user_id in losers:
-        user_id_str = str(user_id)
-        current = elo_data.get(user_id_str, 0)
-        elo_data[user_id_str] = max(0, current - 10)  # cannot go below 0
-
-    save_elo()
+    # --- Apply ELO changes (one transaction per match; losers cannot go below 0) ---
+    ops = [(str(user_id), "add", WIN_ELO) for user_id in winners]
+    ops += [(str(user_id), "add", -10) for user_id in losers]
+    try:
+        await elo_committer.submit(ops, played=[str(user_id) for user_id in winners + losers])
+    except OSError as e:
+        return await ctx.send(f"❌ Couldn't save the result, no ELO was changed: {e}")
 
     # --- Format output ---
     winner_mentions = ", ".join(f"<@{uid}>" for uid in winners)
@@ -388,17 +1223,19 @@ async def winner(ctx, captain: discord.Member):
     # --- Update game status ---
     match_id = draft.get("id")
     if match_id and match_id in games:
-        games[match_id]["status"] = "finished"
-        games[match_id]["winner"] = captain_id
+        games[match_id].status = "finished"
+        games[match_id].winner = captain_id
+        games[match_id].end_phases(time.time())
 
     # --- Cleanup ---
-    drafts.pop(channel_id, None)
-    if channel_id in registered_channels:
-        registered_channels[channel_id]["active_game"] = None
+    clear_match(channel_id, match_id)
     save_data()
 
     await ctx.send("✅ Game marked as finished and draft cleared.")
 
+    # Players may have kept pooling while this match ran
+    await refill_channel(ctx.channel)
+
     
     # --- Check ELO Balance ---
 @bot.command()
@@ -444,14 +1281,18 @@ class LeaderboardView(discord.ui.View):
             await interaction.response.edit_message(embed=self.format_page(), view=self)
 
 
+def sorted_leaderboard():
+    """All (user_id, elo) pairs, highest ELO first."""
+    return sorted(elo_data.items(), key=lambda x: x[1], reverse=True)
+
+
 @bot.command(aliases=["lb"])
 async def leaderboard(ctx):
     """Show paginated ELO leaderboard."""
     if not elo_data:
         return await ctx.send("📭 No ELO data yet.")
 
-    sorted_elos = sorted(elo_data.items(), key=lambda x: x[1], reverse=True)
-    view = LeaderboardView(sorted_elos)
+    view = LeaderboardView(sorted_leaderboard())
     await ctx.send(embed=view.format_page(), view=view)
 
 @commands.has_permissions(administrator=True)
@@ -462,22 +1303,22 @@ async def sub(ctx, user_out: discord.Member, user_in: discord.Member, game_id: s
     game = games.get(game_id)
     if not game:
         return await ctx.send(f"❌ No game found with ID `{game_id}`.")
-    if game["status"] not in ("draft", "active"):
+    if game.status not in ("draft", "active"):
         return await ctx.send(f"⚠️ Game `{game_id}` is not active or draft phase ended.")
 
-    channel_id = game["channel"]
+    channel_id = game.channel
     if channel_id != ctx.channel.id:
         return await ctx.send(f"🚫 This game belongs to <#{channel_id}>, not this channel.")
 
     # Make sure both users exist
-    if user_out.id not in game["players"]:
+    if user_out.id not in game.players:
         return await ctx.send(f"❌ {user_out.mention} is not in this game.")
-    if user_in.id in game["players"]:
+    if user_in.id in game.players:
         return await ctx.send(f"⚠️ {user_in.mention} is already in this game.")
 
     # Update player list
-    game["players"].remove(user_out.id)
-    game["players"].append(user_in.id)
+    game.players.remove(user_out.id)
+    game.players.append(user_in.id)
 
     # If draft data still exists, fix that too
     if channel_id in drafts:
@@ -492,9 +1333,12 @@ async def sub(ctx, user_out: discord.Member, user_in: discord.Member, game_id: s
         if user_out.id in draft["captains"]:
             draft["captains"].remove(user_out.id)
             draft["captains"].append(user_in.id)
+            if draft.get("turn") == user_out.id:
+                draft["turn"] = user_in.id
             # Move their team if necessary
             draft["teams"][user_in.id] = draft["teams"].pop(user_out.id, [])
 
+    invalidate_match_view(game_id)
     save_data()
 
     await ctx.send(
@@ -510,11 +1354,13 @@ async def endgame(ctx):
     if not match_id or match_id not in games:
         return await ctx.send("❌ No active game in this channel.")
 
-    games[match_id]["status"] = "finished"
-    registered_channels[ctx.channel.id]["active_game"] = None
+    games[match_id].status = "finished"
+    games[match_id].end_phases(time.time())
+    clear_match(ctx.channel.id, match_id)
     save_data()
 
     await ctx.send(f"🏆 **Game {match_id} finished!**")
+    await refill_channel(ctx.channel)
 
 @commands.has_permissions(administrator=True)
 @bot.command(aliases=["fj"])
@@ -525,13 +1371,22 @@ async def forcejoin(ctx, member: discord.Member):
     queue = get_queue(ctx)
     if member.id in queue:
         return await ctx.send(f"{member.mention} is already in the queue.")
+    queue_started.setdefault(ctx.channel.id, time.time())
     queue.append(member.id)
     size = registered_channels[ctx.channel.id]["size"]
-    await ctx.send(f"🛠️ Admin added {member.mention} to the queue. ({len(queue)}/{size})")
+    if federated(ctx.channel.id):
+        fed_adjust(ctx.channel.id, 1)
+        await announce_queue(ctx.channel, f"🛠️ Admin added {member.mention} to the federated queue. ({fed_status(ctx.channel.id)})")
+        return await run_federation(size)
+    if matchmaking_enabled(ctx.channel.id):
+        get_pool(ctx.channel.id).add(member.id, elo_data.get(str(member.id), 0), time.time())
+        await announce_queue(ctx.channel, f"🛠️ Admin added {member.mention} to the matchmaking pool. ({len(queue)} waiting)")
+        return await run_matchmaking(ctx.channel)
+    await announce_queue(ctx.channel, f"🛠️ Admin added {member.mention} to the queue. ({len(queue)}/{size})")
 
     # Auto-start draft if queue fills
     if len(queue) >= size:
-        await start_draft(ctx, queue.copy())
+        await start_draft(ctx.channel, queue.copy())
 
 @commands.has_permissions(administrator=True)
 @bot.command(aliases=["fl"])
@@ -542,8 +1397,8 @@ async def forceleave(ctx, member: discord.Member):
     queue = get_queue(ctx)
     if member.id not in queue:
         return await ctx.send(f"{member.mention} is not currently in the queue.")
-    queue.remove(member.id)
-    await ctx.send(f"🗑️ Admin removed {member.mention} from the queue. ({len(queue)} remain)")
+    dequeue(ctx.channel.id, member.id)
+    await announce_queue(ctx.channel, f"🗑️ Admin removed {member.mention} from the queue. ({len(queue)} remain)")
 
 # --- Admin Commands ---
 @commands.has_permissions(administrator=True)
@@ -551,6 +1406,7 @@ async def forceleave(ctx, member: discord.Member):
 async def register(ctx):
     registered_channels[ctx.channel.id] = {"size": 10, "active_game": None}
     queues[ctx.channel.id] = []
+    rebuild_federation()
     save_data()  # <-- persist changes
     await ctx.send("✅ This channel is now registered for queueing.")
 
@@ -559,6 +1415,8 @@ async def register(ctx):
 async def unregister(ctx):
     registered_channels.pop(ctx.channel.id, None)
     queues.pop(ctx.channel.id, None)
+    mm_pools.pop(ctx.channel.id, None)
+    rebuild_federation()
     save_data()  # <-- persist changes
     await ctx.send("❌ This channel has been unregistered from queueing.")
 
@@ -570,21 +1428,28 @@ async def setup(ctx, number: int):
     if not is_registered(ctx):
         return await ctx.send("❌ This channel is not registered yet. Use =register first.")
     registered_channels[ctx.channel.id]["size"] = number
+    rebuild_federation()
     save_data()  # <-- persist changes
     await ctx.send(f"⚙️ Queue size set to {number} players.")
+    if federated(ctx.channel.id):
+        await run_federation(number)
 
 
 # --- Draft Phase ---
-async def start_draft(ctx, queue_list):
+async def start_draft(channel, queue_list, queued_since=None):
     """Start a new draft when queue fills."""
-    size = registered_channels[ctx.channel.id]["size"]
+    open_draft(channel, queue_list, queued_since)
+    await announce_draft(channel)
+
+def open_draft(channel, queue_list, queued_since=None):
+    """Register a new draft and its game record; synchronous, so callers can claim the channel before their first await."""
     match_id = str(uuid.uuid4())[:8]  # short unique ID
 
     # Pick captains
     captains = random.sample(queue_list, 2)
     remaining = [p for p in queue_list if p not in captains]
 
-    drafts[ctx.channel.id] = {
+    drafts[channel.id] = {
         "id": match_id,
         "captains": captains,
         "teams": {captains[0]: [], captains[1]: []},
@@ -594,22 +1459,27 @@ async def start_draft(ctx, queue_list):
     }
 
     # ✅ Save to games list
-    games[match_id] = {
-        "channel": ctx.channel.id,
-        "players": queue_list.copy(),
-        "status": "draft",
-        "map": None,
-        "winner": None
-    }
-    registered_channels[ctx.channel.id]["active_game"] = match_id
+    games[match_id] = GameRecord(channel.id, queue_list, status="draft")
+    registered_channels[channel.id]["active_game"] = match_id
+
+    # Trace: time spent filling the queue, then the draft starts
+    now = time.time()
+    queued_since = queued_since or queue_started.pop(channel.id, None) or now
+    games[match_id].set_phase("queue", queued_since, now)
+    games[match_id].begin_phase("draft", now)
 
     save_data()
 
-    await ctx.send(
-        f"🎯 **Draft Started!** (Match ID: `{match_id}`)\n"
+async def announce_draft(channel):
+    """Post the opened draft's captains and start the first pick's deadline."""
+    draft = drafts[channel.id]
+    captains = draft["captains"]
+    await channel.send(
+        f"🎯 **Draft Started!** (Match ID: `{draft['id']}`)\n"
         f"Captains: <@{captains[0]}> 🆚 <@{captains[1]}>\n"
-        f"<@{drafts[ctx.channel.id]['turn']}> picks first using `=pick or =p @player`"
+        f"<@{draft['turn']}> picks first using `=pick or =p @player`"
     )
+    arm_pick_timer(channel)
 
 
 @bot.command(aliases=["p"])
@@ -625,19 +1495,53 @@ async def pick(ctx, member: discord.Member):
     if member.id not in draft["remaining"]:
         return await ctx.send("That player is not available to pick.")
 
-    draft["teams"][ctx.author.id].append(member.id)
-    draft["remaining"].remove(member.id)
+    await make_pick(ctx.channel, ctx.author.id, member.id)
+
+async def make_pick(channel, captain_id, player_id):
+    """Apply one pick, pass the turn and start voting once everyone is drafted."""
+    draft = drafts[channel.id]
+    draft["teams"][captain_id].append(player_id)
+    draft["remaining"].remove(player_id)
+    invalidate_match_view(draft["id"])
 
     # Swap turn
-    other_captain = [c for c in draft["captains"] if c != ctx.author.id][0]
+    other_captain = [c for c in draft["captains"] if c != captain_id][0]
     draft["turn"] = other_captain
 
-    await ctx.send(f"✅ {ctx.author.mention} picked {member.mention}.")
+    await channel.send(f"✅ <@{captain_id}> picked <@{player_id}>.")
 
     # Check if draft complete
     if not draft["remaining"]:
-        await ctx.send("🏁 Draft complete! Time to vote for gamemode!")
-        await start_gamemode_vote(ctx)
+        scheduler.cancel(("pick", channel.id))
+        await channel.send("🏁 Draft complete! Time to vote for gamemode!")
+        await start_gamemode_vote(channel)
+    else:
+        arm_pick_timer(channel)
+
+def arm_pick_timer(channel, deadline=None):
+    """(Re)start the current captain's pick deadline on the shared scheduler."""
+    draft = drafts.get(channel.id)
+    if not draft or not draft.get("remaining"):
+        return scheduler.cancel(("pick", channel.id))
+    seconds = registered_channels.get(channel.id, {}).get("pick_timeout", PICK_TIMEOUT_DEFAULT)
+    if not seconds:
+        draft["turn_deadline"] = None
+        return scheduler.cancel(("pick", channel.id))
+    draft["turn_deadline"] = deadline or time.time() + seconds
+    scheduler.call_at(draft["turn_deadline"], ("pick", channel.id), lambda: auto_pick(channel, draft["id"]))
+
+async def auto_pick(channel, match_id):
+    """Turn expired: pick the highest-rated remaining player for the captain."""
+    draft = drafts.get(channel.id)
+    if not draft or draft.get("id") != match_id or not draft.get("remaining"):
+        return
+    captain_id = draft["turn"]
+    best = max(draft["remaining"], key=lambda uid: elo_data.get(str(uid), 0))
+    await channel.send(f"⏰ <@{captain_id}> ran out of time — auto-picking the highest-rated player.")
+    # The captain may have picked while the notice was sending
+    if drafts.get(channel.id) is not draft or draft["turn"] != captain_id or best not in draft["remaining"]:
+        return
+    await make_pick(channel, captain_id, best)
 
 # --- Force Start ---
 @commands.has_permissions(administrator=True)
@@ -649,15 +1553,29 @@ async def forcestart(ctx):
         return await ctx.send("❌ No players in queue to start a game with.")
 
     # Random teams
-    random.shuffle(queue)
-    half = len(queue) // 2
-    team1, team2 = queue[:half], queue[half:]
-
+    players = list(queue)
+    random.shuffle(players)
+    half = len(players) // 2
+    team1, team2 = players[:half], players[half:]
+    queued_since = queue_started.get(ctx.channel.id) or time.time()
+    # Take them out of the queue (and any matchmaking/federated pool) so they can't be matched again
+    for user_id in players:
+        dequeue(ctx.channel.id, user_id)
+
+    # Recorded like a drafted match, so =t, =endgame and the vote results find it
+    match_id = str(uuid.uuid4())[:8]
     drafts[ctx.channel.id] = {
+        "id": match_id,
         "captains": [team1[0], team2[0]],
         "teams": {team1[0]: team1[1:], team2[0]: team2[1:]},
+        "remaining": [],
         "phase": "voting"
     }
+    games[match_id] = GameRecord(ctx.channel.id, players, status="draft")
+    games[match_id].set_phase("queue", queued_since, time.time())
+    registered_channels[ctx.channel.id]["active_game"] = match_id
+    save_data()
+    schedule_panel_update(ctx.channel)
 
     team1_mentions = ", ".join([f"<@{p}>" for p in team1])
     team2_mentions = ", ".join([f"<@{p}>" for p in team2])
@@ -669,7 +1587,8 @@ async def forcestart(ctx):
         f"➡️ Moving to gamemode voting..."
     )
 
-    await start_gamemode_vote(ctx)
+    scheduler.cancel(("pick", ctx.channel.id))
+    await start_gamemode_vote(ctx.channel)
 
 # --- Voting Phases ---
 async def start_game(channel, map_name):
@@ -680,84 +1599,144 @@ async def start_game(channel, map_name):
     # Get the current match ID
     match_id = registered_channels[channel.id].get("active_game")
     if match_id and match_id in games:
-        games[match_id]["status"] = "active"
-        games[match_id]["map"] = map_name
+        games[match_id].status = "active"
+        games[match_id].map = map_name
+        games[match_id].begin_phase("game", time.time())
+        invalidate_match_view(match_id)
         save_data()
 
-    # ✅ Clear queue after match setup
-    queues[channel.id] = []
+    # ✅ Clear queue after match setup (matchmaking and federated pools already removed the matched players)
+    if not matchmaking_enabled(channel.id) and not federated(channel.id):
+        queues[channel.id] = []
     save_data()
-
-async def start_gamemode_vote(ctx):
-    players = get_all_players(ctx.channel.id)
-    view = VoteView(["KOTC", "Classic"],
-                    next_step=start_region_vote, players=players)
-    await ctx.send("🎮 **Vote for a Gamemode!** (10s or until all votes in)", view=view)
-    await view.start_timer(ctx)
-
-async def start_region_vote(ctx, gamemode="Classic"):
-    players = get_all_players(ctx.channel.id)
-    view = VoteView(
-        ["US West", "US East", "US Central"],
-        next_step=lambda c, r: start_map_vote(c, gamemode, region=r),
-        players=players
-    )
-    await ctx.send("🌎 **Vote for a Region!** (10s or until all votes in)", view=view)
-    await view.start_timer(ctx)
-
-async def start_map_vote(ctx, gamemode="KOTC", region=None):
-    players = get_all_players(ctx.channel.id)
+    schedule_panel_update(channel)
+
+async def open_vote(channel, view, prompt):
+    """Post a vote, track it for persistence and arm its deadline."""
+    message = await channel.send(prompt, view=view)
+    view.message_id = message.id
+    active_votes[channel.id] = view
+    view.start_timer(channel)
+    save_votes()
+
+async def start_gamemode_vote(channel):
+    trace_phase(channel.id, "gamemode_vote")
+    players = get_all_players(channel.id)
+    view = VoteView("gamemode", ["KOTC", "Classic"], channel.id, players=players)
+    await open_vote(channel, view, f"🎮 **Vote for a Gamemode!** ({VOTE_SECONDS}s or until all votes in)")
+
+async def start_region_vote(channel, gamemode="Classic"):
+    trace_phase(channel.id, "region_vote")
+    players = get_all_players(channel.id)
+    view = VoteView("region", ["US West", "US East", "US Central"], channel.id, players=players, gamemode=gamemode)
+    await open_vote(channel, view, f"🌎 **Vote for a Region!** ({VOTE_SECONDS}s or until all votes in)")
+
+async def start_map_vote(channel, gamemode="KOTC", region=None):
+    trace_phase(channel.id, "map_vote")
+    players = get_all_players(channel.id)
     maps = ["Cluckgrounds", "Bastion", "2 Towers", "Helix"] if gamemode == "KOTC" else ["Castle", "Bastion", "Growler", "Road"]
-    view = FinalVoteView(maps, players=players)
+    view = FinalVoteView("map", maps, channel.id, players=players, gamemode=gamemode, region=region)
     
     # Save gamemode and region to game object before voting ends
-    match_id = registered_channels[ctx.channel.id].get("active_game")
+    match_id = registered_channels[channel.id].get("active_game")
     if match_id in games:
-        games[match_id]["gamemode"] = gamemode
-        games[match_id]["region"] = region
+        games[match_id].gamemode = gamemode
+        games[match_id].region = region
+        invalidate_match_view(match_id)
 
-    await ctx.send(f"🗺️ **Vote for a Map!** *(Gamemode: {gamemode})* (10s or until all votes in)", view=view)
-    await view.start_timer(ctx)
+    await open_vote(channel, view, f"🗺️ **Vote for a Map!** *(Gamemode: {gamemode})* ({VOTE_SECONDS}s or until all votes in)")
 
 
 
 # --- Voting UI Classes ---
+active_votes = {}  # {channel_id: VoteView} — persisted by save_votes()
+pending_votes = {}  # {channel_id: saved vote state} — loaded from disk, re-attached in on_ready
+
 class VoteView(discord.ui.View):
-    def __init__(self, options, next_step=None, players=None):
-        super().__init__(timeout=10)  # 10-second timer
+    def __init__(self, stage, options, channel_id, players=None, gamemode=None, region=None):
+        super().__init__(timeout=None)  # deadline lives on the scheduler so it survives restarts
+        self.stage = stage  # "gamemode" -> "region" -> "map"
+        self.channel_id = channel_id
+        self.match_id = registered_channels.get(channel_id, {}).get("active_game")
         self.votes = {opt: 0 for opt in options}
         self.voted_users = set()
         self.players = players or []
-        self.next_step = next_step
-        for opt in options:
-            self.add_item(VoteButton(label=opt))
-
-    async def start_timer(self, ctx):
-        await asyncio.sleep(10)
-        if not self.is_finished():
-            await self.end_vote(ctx)
-        self.stop()
-
-    async def end_vote(self, ctx):
-        if not self.votes:
+        self.gamemode = gamemode
+        self.region = region
+        self.deadline = None
+        self.message_id = None
+        self.ended = False
+        for i, opt in enumerate(options):
+            # Stable IDs so a restored view keeps receiving clicks on the original message
+            self.add_item(VoteButton(label=opt, custom_id=f"vote:{channel_id}:{self.match_id}:{stage}:{i}"))
+
+    def to_json(self):
+        return {
+            "stage": self.stage,
+            "match_id": self.match_id,
+            "votes": self.votes,
+            "voted_users": list(self.voted_users),
+            "players": self.players,
+            "gamemode": self.gamemode,
+            "region": self.region,
+            "deadline": self.deadline,
+            "message_id": self.message_id
+        }
+
+    @staticmethod
+    def from_json(channel_id, state):
+        view_cls = FinalVoteView if state["stage"] == "map" else VoteView
+        view = view_cls(state["stage"], list(state["votes"]), channel_id, players=state["players"],
+                        gamemode=state.get("gamemode"), region=state.get("region"))
+        view.match_id = state.get("match_id")
+        view.votes = dict(state["votes"])
+        view.voted_users = set(state["voted_users"])
+        view.deadline = state["deadline"]
+        view.message_id = state["message_id"]
+        return view
+
+    def start_timer(self, channel):
+        """Arm the deadline; restored views keep their original one (past deadlines fire right away)."""
+        if self.deadline is None:
+            self.deadline = time.time() + VOTE_SECONDS
+        scheduler.call_at(self.deadline, ("vote", channel.id), lambda: self.end_vote(channel))
+
+    async def end_vote(self, channel):
+        if self.ended:
             return
+        self.ended = True
+        self.stop()
+        scheduler.cancel(("vote", channel.id))
+        if active_votes.get(channel.id) is self:
+            del active_votes[channel.id]
+        save_votes()
         winner = max(self.votes, key=self.votes.get)
-        await ctx.send(f"# 🗳️ Voting has ended! Winning option: **{winner}**")
-        if self.next_step:
-            await self.next_step(ctx, winner)
+        await self.finish(channel, winner)
+
+    async def finish(self, channel, winner):
+        await channel.send(f"# 🗳️ Voting has ended! Winning option: **{winner}**")
+        if self.stage == "gamemode":
+            await start_region_vote(channel, winner)
+        elif self.stage == "region":
+            await start_map_vote(channel, self.gamemode, region=winner)
 
 class VoteButton(discord.ui.Button):
-    def __init__(self, label):
-        super().__init__(label=label, style=discord.ButtonStyle.primary)
+    def __init__(self, label, custom_id=None):
+        super().__init__(label=label, style=discord.ButtonStyle.primary, custom_id=custom_id)
 
     async def callback(self, interaction: discord.Interaction):
         parent: VoteView = self.view
+        if parent.ended:
+            return await interaction.response.send_message(
+                "⌛ This vote has already ended.", ephemeral=True
+            )
         if interaction.user.id in parent.voted_users:
             return await interaction.response.send_message(
                 "⚠️ You already voted!", ephemeral=True
             )
         parent.voted_users.add(interaction.user.id)
         parent.votes[self.label] += 1
+        save_votes()
         await interaction.response.send_message(
             f"✅ You voted for **{self.label}**!", ephemeral=True
         )
@@ -765,53 +1744,25 @@ class VoteButton(discord.ui.Button):
         # End vote early if everyone voted
         if parent.players and len(parent.voted_users) >= len(parent.players):
             await parent.end_vote(interaction.channel)
-            parent.stop()
 
 class FinalVoteView(VoteView):
-    async def end_vote(self, ctx):
-        winner = max(self.votes, key=self.votes.get)
-        await ctx.send(f"🗳️ Final map: **{winner}**! Game starting soon...")
+    async def finish(self, channel, winner):
+        await channel.send(f"🗳️ Final map: **{winner}**! Game starting soon...")
 
         # Start the game
-        await start_game(ctx.channel, winner)
+        await start_game(channel, winner)
 
         # Send a detailed game info embed
-        match_id = registered_channels[ctx.channel.id].get("active_game")
+        match_id = registered_channels[channel.id].get("active_game")
         game = games.get(match_id)
-        draft = drafts.get(ctx.channel.id)
+        draft = drafts.get(channel.id)
 
         if not game or not draft:
             return  # safety check
 
-        embed = discord.Embed(
-            title=f"# 🎮 Game Started! (ID: {match_id})",
-            color=discord.Color.green()
-        )
-
-        # Add teams
-        for captain_id, members in draft["teams"].items():
-            try:
-                captain = await ctx.guild.fetch_member(captain_id)
-                captain_name = captain.display_name
-            except:
-                captain_name = f"Unknown ({captain_id})"
-            member_mentions = []
-            for m_id in members:
-                member = ctx.guild.get_member(m_id)
-                member_mentions.append(member.mention if member else f"<@{m_id}>")
-            embed.add_field(
-                name=f"🏴‍☠️ Team {captain_name}",
-                value="\n".join(member_mentions) if member_mentions else "*No members*",
-                inline=False
-            )
-
-        # Add other game details
-        embed.add_field(name="- 🗺️ Map", value=game.get("map", "Unknown"), inline=True)
-        embed.add_field(name="- 🌎 Region", value=game.get("region", "Unknown"), inline=True)
-        embed.add_field(name="- 🎮 Gamemode", value=game.get("gamemode", "Unknown"), inline=True)
-        embed.add_field(name="- 🆔 Game ID", value=match_id, inline=True)
-
-        await ctx.send(embed=embed)
+        embed = await render_match_view(channel.guild, match_id)
+        if embed:
+            await channel.send(f"# 🎮 Game Started! (ID: `{match_id}`)", embed=embed)
 
 
 
@@ -824,13 +1775,17 @@ async def start_game(channel, map_name):
     # Get the current match ID
     match_id = registered_channels[channel.id].get("active_game")
     if match_id and match_id in games:
-        games[match_id]["status"] = "active"
-        games[match_id]["map"] = map_name
+        games[match_id].status = "active"
+        games[match_id].map = map_name
+        games[match_id].begin_phase("game", time.time())
+        invalidate_match_view(match_id)
         save_data()
 
-    # ✅ Clear queue after match setup
-    queues[channel.id] = []
+    # ✅ Clear queue after match setup (matchmaking and federated pools already removed the matched players)
+    if not matchmaking_enabled(channel.id) and not federated(channel.id):
+        queues[channel.id] = []
     save_data()
+    schedule_panel_update(channel)
 
 
 
@@ -839,9 +1794,14 @@ class GameInfoView(discord.ui.View):
         super().__init__(timeout=None)
         self.map_name = map_name
 
-    @discord.ui.button(label="Send Game Info", style=discord.ButtonStyle.success)
+    @discord.ui.button(label="Send Game Info", style=discord.ButtonStyle.success, custom_id="game_info:send")
     async def send_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        modal = GameInfoModal(self.map_name)
+        map_name = self.map_name
+        if map_name is None:  # restored persistent view — look the map up from the channel's game
+            match_id = registered_channels.get(interaction.channel.id, {}).get("active_game")
+            game = games.get(match_id)
+            map_name = game.map if game else None
+        modal = GameInfoModal(map_name)
         await interaction.response.send_modal(modal)
 
 class GameInfoModal(discord.ui.Modal, title="Send Game Info"):
@@ -862,13 +1822,18 @@ class GameInfoModal(discord.ui.Modal, title="Send Game Info"):
 
         await interaction.response.send_message("✅ Info sent to all players!", ephemeral=True)
 
+        # Same teams embed as the channel, built once for every DM
+        match_id = registered_channels.get(interaction.channel.id, {}).get("active_game")
+        match_embed = await render_match_view(interaction.guild, match_id) if match_id else None
+        embeds = [embed, match_embed] if match_embed else [embed]
+
         # Send DM to every player in this game
         players = get_all_players(interaction.channel.id)
         for player_id in players:
             member = interaction.guild.get_member(player_id)
             if member:
                 try:
-                    await member.send(embed=embed)
+                    await member.send(embeds=embeds)
                 except discord.Forbidden:
                     pass  # can't DM this user
 
@@ -917,6 +1882,8 @@ class HelpPaginator(View):
 @bot.command(name="help", aliases=["h"])
 async def help_command(ctx):
     """Paginated help command showing categorized commands."""
+    for name in LAZY_EXTENSIONS:
+        await load_lazy_extension(name)
     # Define your categories
     categories = {
         "🎮 Queue & Games": [
@@ -927,18 +1894,21 @@ async def help_command(ctx):
             bot.get_command("sub"),
             bot.get_command("teams"),
             bot.get_command("gameslist"),
+            bot.get_command("mmstats"),
         ],
         "🏗️ Draft Phase": [
             bot.get_command("startdraft") if bot.get_command("startdraft") else None,
             bot.get_command("pick"),
             bot.get_command("lockteams") if bot.get_command("lockteams") else None,
-            bot.get_command("forcestart")
+            bot.get_command("forcestart"),
+            bot.get_command("setpicktimer")
         ],
         "🗳️ Voting & Misc": [
             bot.get_command("vote") if bot.get_command("vote") else None,
             bot.get_command("queueinfo") if bot.get_command("queueinfo") else None,
             bot.get_command("ping") if bot.get_command("ping") else None,
             bot.get_command("elobalance") if bot.get_command("elobalance") else None,
+            bot.get_command("season"),
         ],
         "🛠️ Admin Commands": [
              bot.get_command("register"),
@@ -946,9 +1916,21 @@ async def help_command(ctx):
             bot.get_command("setup"),
             bot.get_command("forcejoin"),
             bot.get_command("forceleave"),
+            bot.get_command("queuepanel"),
+            bot.get_command("matchmaking"),
+            bot.get_command("federate"),
+            bot.get_command("queueban"),
+            bot.get_command("queuebans"),
             bot.get_command("elo"),
             bot.get_command("setwinelo"),
-            bot.get_command("winner")
+            bot.get_command("newseason"),
+            bot.get_command("resetelo"),
+            bot.get_command("winner"),
+            bot.get_command("phasestats"),
+            bot.get_command("loopstats"),
+            bot.get_command("exporttraces"),
+            bot.get_command("export"),
+            bot.get_command("import")
         ]
     }
 
@@ -959,10 +1941,90 @@ async def help_command(ctx):
     embed = paginator.get_embed()
     await ctx.send(embed=embed, view=paginator)
 
+def restore_matches():
+    """Re-arm pick timers and re-attach in-flight votes saved before a restart."""
+    for channel_id, draft in drafts.items():
+        channel = bot.get_channel(channel_id)
+        if channel and draft.get("turn_deadline") and not scheduler.deadline(("pick", channel_id)):
+            arm_pick_timer(channel, deadline=draft["turn_deadline"])
+
+    for channel_id, state in pending_votes.items():
+        channel = bot.get_channel(channel_id)
+        if not channel or channel_id in active_votes:
+            continue
+        view = VoteView.from_json(channel_id, state)
+        bot.add_view(view, message_id=view.message_id)
+        active_votes[channel_id] = view
+        view.start_timer(channel)
+    pending_votes.clear()
+
+# --- Start-up & Extensions ---
+startup_stages = {}  # {stage: seconds}, in the order they ran
+connect_started = None
+extension_lock = asyncio.Lock()  # two first uses at once must not load the same extension twice
+LAZY_EXTENSIONS = {  # command -> extension defining it, loaded the first time the command is used
+    "mmstats": "cogs.stats",
+    "loopstats": "cogs.stats",
+    "phasestats": "cogs.stats",
+    "exporttraces": "cogs.stats",
+    "startup": "cogs.stats",
+    "export": "cogs.bulk",
+    "import": "cogs.bulk"
+}
+
+@contextmanager
+def startup_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_stages[name] = time.perf_counter() - start
+
+async def load_lazy_extension(name):
+    """Load the extension behind command `name` unless it's loaded; False if no extension defines it."""
+    extension = LAZY_EXTENSIONS.get(name)
+    if not extension:
+        return False
+    async with extension_lock:
+        if extension not in bot.extensions:
+            with startup_stage(f"load {extension}"):
+                await bot.load_extension(extension)
+    return True
+
+async def setup_hook():
+    """Runs before the gateway connects, so no command or click ever sees unloaded state."""
+    global connect_started
+    with startup_stage("load elo"):
+        load_elo()
+    with startup_stage("load data"):
+        load_data()
+    with startup_stage("views"):
+        bot.add_view(QueuePanelView())  # keep pinned queue panels clickable across restarts
+        bot.add_view(GameInfoView(None))
+    watchdog.start()
+    connect_started = time.perf_counter()
+
+bot.setup_hook = setup_hook
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound) and await load_lazy_extension(ctx.invoked_with):
+        if bot.get_command(ctx.invoked_with):
+            return await bot.invoke(await bot.get_context(ctx.message, cls=type(ctx)))
+    await commands.Bot.on_command_error(bot, ctx, error)
+
 @bot.event
 async def on_ready():
-    load_data()
+    first_ready = "connect" not in startup_stages  # on_ready fires again after reconnects
+    if first_ready and connect_started:
+        startup_stages["connect"] = time.perf_counter() - connect_started
+    with startup_stage("restore matches"):
+        restore_matches()
+    resume_season_rollover()
     print(f"✅ Logged in as {bot.user}")
+    if first_ready:
+        startup_stages["ready"] = time.perf_counter() - startup_t0
+        print("🚀 Start-up: " + ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in startup_stages.items()))
 
     if not hasattr(bot, "_inactivity_tasks"):
         bot._inactivity_tasks = {}
@@ -977,6 +2039,55 @@ async def on_ready():
             bot._inactivity_tasks[channel_id] = asyncio.create_task(check_inactivity(channel))
 
 
+# --- Event Recorder ---
+record_fp = None
+
+def record_event(kind, user, channel_id, **fields):
+    """Append one inbound event to RECORD_FILE (no-op unless RECORD_EVENTS is set)."""
+    global record_fp
+    if not RECORD_FILE:
+        return
+    if record_fp is None:
+        record_fp = open(RECORD_FILE, "a", buffering=1)  # line-buffered so a crash loses at most one event
+    record = {"t": round(time.time(), 3), "kind": kind, "user": user.id, "channel": channel_id}
+    record.update(fields)
+    record_fp.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+def component_label(message, custom_id):
+    """Find the label of the clicked component (auto-generated custom IDs don't survive a restart)."""
+    for row in getattr(message, "components", None) or []:
+        for child in getattr(row, "children", []):
+            if getattr(child, "custom_id", None) == custom_id:
+                return getattr(child, "label", None)
+    return None
+
+@bot.event
+async def on_command(ctx):
+    perms = getattr(ctx.author, "guild_permissions", None)
+    record_event(
+        "command", ctx.author, ctx.channel.id,
+        command=ctx.command.qualified_name,
+        content=ctx.message.content,
+        admin=bool(perms and perms.administrator)
+    )
+
+@bot.event
+async def on_interaction(interaction):
+    if not RECORD_FILE or not interaction.channel:
+        return
+    data = interaction.data or {}
+    if interaction.type == discord.InteractionType.component:
+        custom_id = data.get("custom_id")
+        record_event(
+            "component", interaction.user, interaction.channel.id,
+            custom_id=custom_id,
+            label=component_label(interaction.message, custom_id)
+        )
+    elif interaction.type == discord.InteractionType.modal_submit:
+        values = [c.get("value") for row in data.get("components", []) for c in row.get("components", [])]
+        record_event("modal", interaction.user, interaction.channel.id, values=values)
+
+
 @bot.event
 async def on_message(message):
     if message.author.bot:
@@ -1012,7 +2123,7 @@ async def check_inactivity(channel):
 
         for user_id in inactive:
             if user_id in queue:
-                queue.remove(user_id)
+                dequeue(channel.id, user_id)
                 member = channel.guild.get_member(user_id)
                 if member:
                     try:
@@ -1029,6 +2140,7 @@ async def check_inactivity(channel):
 
         if inactive:
             save_data()
+            schedule_panel_update(channel)
 
         await asyncio.sleep(60)
 
@@ -1065,6 +2177,31 @@ async def settimeout(ctx, seconds: int):
     bot._inactivity_tasks[ctx.channel.id] = asyncio.create_task(check_inactivity(ctx.channel))
 
 
+# --- SetPickTimer Cmd ---
+@commands.has_permissions(administrator=True)
+@bot.command()
+async def setpicktimer(ctx, seconds: int):
+    """Set how long captains get per pick before an auto-pick (0 disables)."""
+    if not is_registered(ctx):
+        return await ctx.send("❌ This channel is not registered for queueing.")
+    if seconds and seconds < 10:
+        return await ctx.send("⚠️ Pick timer must be at least 10 seconds (or 0 to disable).")
+
+    registered_channels[ctx.channel.id]["pick_timeout"] = seconds
+    save_data()
+    if ctx.channel.id in drafts:
+        arm_pick_timer(ctx.channel)  # apply to the turn in progress
+
+    if not seconds:
+        return await ctx.send("⏱️ Pick timer disabled for this channel.")
+    await ctx.send(f"⏱️ Captains now get **{seconds}s** per pick before the highest-rated player is auto-picked.")
+
+
 # (Removed the deprecated remove_inactive_from_queues() and bot.loop.create_task(...))
 
-bot.run(TOKEN)
+startup_stages["import"] = time.perf_counter() - startup_t0
+
+if __name__ == "__main__":
+    if API_PORT:
+        api.start_api(port=int(API_PORT))
+    bot.run(TOKEN)
@@ -0,0 +1,147 @@
+"""Compact match history records."""
+from array import array
+
+
+class Codebook:
+    """Maps repeated strings (status, map, region, gamemode) to small ints shared by every record."""
+    def __init__(self, *values):
+        self.values = [None]  # code 0 = unset
+        self.codes = {None: 0}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            # Unknown values (custom maps, old saves) get a new code instead of being dropped
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code):
+        return self.values[code]
+
+
+STATUSES = Codebook("draft", "active", "finished")
+GAMEMODES = Codebook("KOTC", "Classic")
+REGIONS = Codebook("US West", "US East", "US Central")
+MAPS = Codebook("Cluckgrounds", "Bastion", "2 Towers", "Helix", "Castle", "Growler", "Road")
+
+# Match lifecycle phases, in order; a trace stores a (start, end) timestamp pair per phase
+PHASES = ("queue", "draft", "gamemode_vote", "region_vote", "map_vote", "game")
+PHASE_INDEX = {phase: i for i, phase in enumerate(PHASES)}
+
+
+class GameRecord:
+    """One entry of `games`: small-int codes for repeated strings and packed player IDs."""
+    __slots__ = ("channel", "players", "winner", "teams", "trace", "_status", "_map", "_gamemode", "_region")
+
+    def __init__(self, channel, players, status="draft", map=None, winner=None, gamemode=None, region=None, teams=None):
+        self.channel = channel
+        self.players = array("Q", players)
+        self.winner = winner
+        self.teams = teams
+        self.trace = None  # array('d') of start/end pairs per PHASES entry, 0.0 = not reached
+        self._status = STATUSES.code(status)
+        self._map = MAPS.code(map)
+        self._gamemode = GAMEMODES.code(gamemode)
+        self._region = REGIONS.code(region)
+
+    @property
+    def status(self):
+        return STATUSES.value(self._status)
+
+    @status.setter
+    def status(self, value):
+        self._status = STATUSES.code(value)
+
+    @property
+    def map(self):
+        return MAPS.value(self._map)
+
+    @map.setter
+    def map(self, value):
+        self._map = MAPS.code(value)
+
+    @property
+    def gamemode(self):
+        return GAMEMODES.value(self._gamemode)
+
+    @gamemode.setter
+    def gamemode(self, value):
+        self._gamemode = GAMEMODES.code(value)
+
+    @property
+    def region(self):
+        return REGIONS.value(self._region)
+
+    @region.setter
+    def region(self, value):
+        self._region = REGIONS.code(value)
+
+    def set_phase(self, phase, start, end=0.0):
+        if self.trace is None:
+            self.trace = array("d", bytes(16 * len(PHASES)))
+        i = 2 * PHASE_INDEX[phase]
+        self.trace[i] = start
+        self.trace[i + 1] = end
+
+    def begin_phase(self, phase, ts):
+        """Start `phase` at `ts`, closing whatever phase was still running."""
+        self.end_phases(ts)
+        self.set_phase(phase, ts)
+
+    def end_phases(self, ts):
+        if self.trace is None:
+            return
+        for i in range(0, len(self.trace), 2):
+            if self.trace[i] and not self.trace[i + 1]:
+                self.trace[i + 1] = ts
+
+    def phase_durations(self):
+        """{phase: seconds} for every completed phase."""
+        if self.trace is None:
+            return {}
+        return {
+            phase: self.trace[2 * i + 1] - self.trace[2 * i]
+            for i, phase in enumerate(PHASES)
+            if self.trace[2 * i] and self.trace[2 * i + 1]
+        }
+
+    def to_json(self):
+        data = {
+            "channel": self.channel,
+            "players": self.players.tolist(),
+            "status": self.status,
+            "map": self.map,
+            "winner": self.winner,
+            "gamemode": self.gamemode,
+            "region": self.region
+        }
+        if self.teams:
+            data["teams"] = self.teams
+        if self.trace is not None:
+            data["trace"] = {
+                phase: [self.trace[2 * i], self.trace[2 * i + 1]]
+                for i, phase in enumerate(PHASES)
+                if self.trace[2 * i]
+            }
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a record from the dict format saved in queue_data.json."""
+        game = cls(
+            data["channel"],
+            data.get("players", []),
+            status=data.get("status", "draft"),
+            map=data.get("map"),
+            winner=data.get("winner"),
+            gamemode=data.get("gamemode"),
+            region=data.get("region"),
+            teams={int(c): m for c, m in data["teams"].items()} if data.get("teams") else None
+        )
+        for phase, (start, end) in data.get("trace", {}).items():
+            if phase in PHASE_INDEX:
+                game.set_phase(phase, start, end)
+        return game
@@ -0,0 +1,379 @@
+"""
+Replay a RECORD_EVENTS log through the real handlers in main.py against a stubbed Discord layer.
+
+    python replay.py events.jsonl                 # original timing
+    python replay.py events.jsonl --speed 10      # 10x faster
+    python replay.py events.jsonl --speed 0       # as fast as possible
+    python replay.py events.jsonl --state backup/ --out final_state.json
+
+Nothing is sent to Discord: channels, members and interactions are in-memory fakes.
+State files are read from / written to a scratch directory, never the live ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from collections import defaultdict
+
+import discord
+from discord.ext import commands
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_FILES = [
+    "queue_data.json", "elo_data.json", "queue_bans.json", "queue_bans.log",
+    "vote_state.json", "season_data.json", "season_job.json"
+]
+
+
+# --- Stubbed Discord layer ---
+class FakeUser:
+    def __init__(self, user_id, guild=None, admin=False):
+        self.id = user_id
+        self.name = self.display_name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.guild = guild
+        self.admin = admin
+        self.dms = []
+
+    @property
+    def guild_permissions(self):
+        return discord.Permissions.all() if self.admin else discord.Permissions.none()
+
+    async def send(self, content=None, **kwargs):
+        self.dms.append((content, kwargs))
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = 1
+        self.members = {}
+        self.filesize_limit = 25 * 1024 * 1024
+
+    def get_member(self, user_id):
+        if user_id not in self.members:
+            self.members[user_id] = FakeUser(user_id, guild=self)
+        return self.members[user_id]
+
+    def get_member_named(self, name):
+        return None
+
+    async def fetch_member(self, user_id):
+        return self.get_member(user_id)
+
+
+class FakeMessage:
+    _next_id = 1
+    _state = None  # set to the bot's ConnectionState before replaying
+
+    def __init__(self, channel, author, content=None, view=None):
+        self.id = FakeMessage._next_id
+        FakeMessage._next_id += 1
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content or ""
+        self.view = view
+        self.mentions = []
+        self.attachments = []
+        self.jump_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{self.id}"
+
+    async def edit(self, **kwargs):
+        self.channel.edits += 1
+
+    async def pin(self):
+        pass
+
+    async def unpin(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+        self.type = discord.ChannelType.text
+        self.mention = f"<#{channel_id}>"
+        self.name = f"channel{channel_id}"
+        self.sent = 0
+        self.edits = 0
+        self.views = []  # views attached to messages, newest last
+
+    def permissions_for(self, member):
+        return member.guild_permissions
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, None)
+
+    async def send(self, content=None, view=None, **kwargs):
+        self.sent += 1
+        if view is not None:
+            self.views.append(view)
+        return FakeMessage(self, None, content, view)
+
+
+class ReplayContext(commands.Context):
+    """Routes ctx.send to the fake channel instead of the HTTP client."""
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class ReplayMemberConverter(commands.IDConverter):
+    """Resolves member mentions/IDs against the fake guild instead of the gateway."""
+    async def convert(self, ctx, argument):
+        match = self._get_id_match(argument) or re.match(r"<@!?([0-9]{15,20})>$", argument)
+        if match is None:
+            raise commands.MemberNotFound(argument)
+        return ctx.guild.get_member(int(match.group(1)))
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, *args, **kwargs):
+        self.done = True
+
+    async def edit_message(self, **kwargs):
+        self.done = True
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def send_modal(self, modal):
+        self.done = True
+        self.interaction.replayer.pending_modals[self.interaction.user.id] = modal
+
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, replayer, user, channel):
+        self.replayer = replayer
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.message = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup()
+
+
+# --- Replay ---
+class Replayer:
+    def __init__(self, bot, verbose=False):
+        self.bot = bot
+        self.verbose = verbose
+        self.guild = FakeGuild()
+        self.channels = {}
+        self.pending_modals = {}  # {user_id: modal awaiting its "modal" event}
+        self.persistent_views = []
+        self.latencies = defaultdict(list)  # {event name: [seconds]}
+        self.errors = defaultdict(int)
+
+    def channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self.guild)
+        return self.channels[channel_id]
+
+    def find_item(self, channel, event):
+        """Newest view item matching the event's custom ID (persistent buttons) or label."""
+        for view in list(reversed(channel.views)) + self.persistent_views:
+            if view.is_finished():
+                continue
+            for item in view.children:
+                if getattr(item, "custom_id", None) == event.get("custom_id"):
+                    return item
+            for item in view.children:
+                if event.get("label") and getattr(item, "label", None) == event["label"]:
+                    return item
+        return None
+
+    async def dispatch(self, event):
+        channel = self.channel(event["channel"])
+        user = self.guild.get_member(event["user"])
+        kind = event["kind"]
+
+        if kind == "command":
+            user.admin = event.get("admin", False)
+            message = FakeMessage(channel, user, event["content"])
+            ctx = await self.bot.get_context(message, cls=ReplayContext)
+            name = event.get("command", "?")
+            await self.bot.invoke(ctx)
+            return name
+
+        interaction = FakeInteraction(self, user, channel)
+        if kind == "component":
+            item = self.find_item(channel, event)
+            name = f"button:{event.get('label') or event.get('custom_id')}"
+            if item is None:
+                raise LookupError(f"no live view has {name}")
+            await item.callback(interaction)
+            return name
+        if kind == "modal":
+            modal = self.pending_modals.pop(user.id, None)
+            if modal is None:
+                raise LookupError("modal submitted without an open modal")
+            for child, value in zip(modal.children, event.get("values", [])):
+                child._value = value
+            await modal.on_submit(interaction)
+            return f"modal:{type(modal).__name__}"
+        raise ValueError(f"unknown event kind {kind!r}")
+
+    async def timed(self, event):
+        start = time.perf_counter()
+        name = event.get("command") or event["kind"]
+        try:
+            name = await self.dispatch(event)
+        except Exception as e:
+            if self.verbose:
+                traceback.print_exc()
+            self.errors[f"{name}: {type(e).__name__}"] += 1
+        self.latencies[name].append(time.perf_counter() - start)
+
+    async def run(self, events, speed):
+        tasks = []
+        first = events[0]["t"] if events else 0
+        started = time.perf_counter()
+        for event in events:
+            if speed > 0:
+                delay = (event["t"] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.timed(event)))
+            if speed == 0:
+                await asyncio.sleep(0)  # keep event order without waiting on handlers
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def load_events(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay(args, events):
+    import main  # imported here so it reads state from the scratch directory
+
+    # Scale every timer (votes, pick deadlines, bans, debounce) so accelerated replays don't wait in real time
+    scale = args.speed if args.speed > 0 else 1000
+    main.PANEL_DEBOUNCE_MS = main.PANEL_DEBOUNCE_MS / scale
+    call_at = main.scheduler.call_at
+
+    def scaled_call_at(deadline, key, callback):
+        now = time.time()
+        return call_at(now + max(0, deadline - now) / scale, key, callback)
+    main.scheduler.call_at = scaled_call_at
+    commands.converter.CONVERTER_MAPPING[discord.Member] = ReplayMemberConverter
+
+    bot = main.bot
+    await bot._async_setup_hook()
+    bot._connection.user = FakeUser(0)
+    FakeMessage._state = bot._connection
+    main.load_elo()
+    main.load_data()
+    for name in main.LAZY_EXTENSIONS:  # load up front so first uses aren't timed or counted as errors
+        await main.load_lazy_extension(name)
+
+    replayer = Replayer(bot, verbose=args.verbose)
+    replayer.persistent_views.append(main.QueuePanelView())
+    bot.get_channel = lambda channel_id: replayer.channels.get(channel_id)
+
+    # As on_ready after a restart: re-arm restored pick deadlines, re-attach saved votes, resume a rollover
+    for channel_id in list(main.drafts) + list(main.pending_votes):
+        replayer.channel(channel_id)
+    main.restore_matches()
+    for channel_id, view in main.active_votes.items():
+        replayer.channel(channel_id).views.append(view)
+    main.resume_season_rollover()
+
+    async def on_command_error(ctx, error):
+        error = getattr(error, "original", error)
+        replayer.errors[f"{ctx.command}: {type(error).__name__}"] += 1
+        if args.verbose:
+            traceback.print_exception(error)
+    bot.add_listener(on_command_error, "on_command_error")
+
+    elapsed = await replayer.run(events, args.speed)
+    await asyncio.sleep(main.VOTE_SECONDS * 4 / scale)  # let trailing vote chains settle
+
+    print(f"▶️ Replayed {len(events)} events in {elapsed:.2f}s (speed {args.speed or 'max'})")
+    print(f"{'event':<28}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, values in sorted(replayer.latencies.items()):
+        ms = [v * 1000 for v in values]
+        print(f"{name:<28}{len(ms):>7}{percentile(ms, 50):>10.2f}{percentile(ms, 90):>10.2f}"
+              f"{percentile(ms, 99):>10.2f}{max(ms):>10.2f}")
+    if replayer.errors:
+        print("⚠️ Errors:")
+        for name, count in sorted(replayer.errors.items()):
+            print(f"  {name} x{count}")
+
+    sent = sum(c.sent for c in replayer.channels.values())
+    edits = sum(c.edits for c in replayer.channels.values())
+    print(f"📨 Messages sent: {sent}, edits: {edits}")
+    print(f"📦 Final state: {sum(len(q) for q in main.queues.values())} queued, "
+          f"{len(main.games)} games, {len(main.drafts)} drafts, {len(main.elo_data)} rated players")
+
+    if args.out:
+        state = {
+            "queues": main.queues,
+            "games": {match_id: game.to_json() for match_id, game in main.games.items()},
+            "drafts": main.drafts,
+            "elo_data": main.elo_data,
+        }
+        with open(args.out, "w") as f:
+            json.dump(state, f, indent=2, default=str)
+        print(f"💾 Final state written to {args.out}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="JSONL event log captured with RECORD_EVENTS")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, 0 = no delays")
+    parser.add_argument("--state", help="directory with state files to start from (default: empty state)")
+    parser.add_argument("--verbose", action="store_true", help="print a traceback for every failed event")
+    parser.add_argument("--out", help="write final queues/games/drafts/elo_data as JSON here")
+    args = parser.parse_args()
+
+    events = load_events(args.log)
+    if args.out:
+        args.out = os.path.abspath(args.out)
+
+    workdir = tempfile.mkdtemp(prefix="scrim-replay-")
+    if args.state:
+        for name in STATE_FILES:
+            path = os.path.join(args.state, name)
+            if os.path.exists(path):
+                shutil.copy(path, workdir)
+    os.environ["RECORD_EVENTS"] = ""  # never record the replay itself
+    sys.path.insert(0, HERE)
+    os.chdir(workdir)
+    try:
+        asyncio.run(replay(args, events))
+    finally:
+        os.chdir(HERE)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_cli()